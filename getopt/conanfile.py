@@ -1,6 +1,5 @@
 from conan import ConanFile
 from conan.tools.cmake import CMakeToolchain, CMake, cmake_layout, CMakeDeps
-from conan.tools.files import get
 import os
 
 class libobjc2Recipe(ConanFile):
@@ -21,7 +20,8 @@ class libobjc2Recipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
 
     def config_options(self):
         if self.settings.os == "Windows":
@@ -38,16 +38,31 @@ class libobjc2Recipe(ConanFile):
         deps = CMakeDeps(self)
         deps.generate()
         tc = CMakeToolchain(self)
+
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_compiler_cache(self, tc)
+
         tc.generate()
 
     def build(self):
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            cmake.configure()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "build"):
+            cmake.build()
 
     def package(self):
         cmake = CMake(self)
-        cmake.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            cmake.install()
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
 
     def package_info(self):
         self.cpp_info.libs = ["getopt"]
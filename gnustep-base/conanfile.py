@@ -1,11 +1,10 @@
 from conan import ConanFile
-from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain, PkgConfig, PkgConfigDeps
-from conan.tools.files import get, apply_conandata_patches, copy, rmdir, mkdir, save, load
+from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain, PkgConfigDeps
+from conan.tools.files import apply_conandata_patches
 from conan.tools.build import cross_building
 from conan.tools.env import VirtualRunEnv, Environment
 
 import os
-import yaml
 
 class GnustepBaseRecipe(ConanFile):
     name = "gnustep-base"
@@ -17,8 +16,8 @@ class GnustepBaseRecipe(ConanFile):
     
     # Binary configuration
     settings = "os", "compiler", "build_type", "arch"
-    options = {"shared": [True, False], "fPIC": [True, False], "objc_runtime": ["gnu", "ng"]}
-    default_options = {"shared": True, "fPIC": True, "objc_runtime": "ng"}
+    options = {"shared": [True, False], "fPIC": [True, False], "objc_runtime": ["gnu", "ng"], "lto": ["off", "thin", "full"], "pgo": ["off", "generate", "use"], "function_sections": [True, False], "static_runtime": [True, False], "allocator": ["system", "jemalloc", "mimalloc"], "modules": [True, False], "split_debug_info": [True, False]}
+    default_options = {"shared": True, "fPIC": True, "objc_runtime": "ng", "lto": "off", "pgo": "off", "function_sections": False, "static_runtime": False, "allocator": "system", "modules": False, "split_debug_info": False}
     exports_sources = "*.patch"
     python_requires = "gnustep-helpers/0.1"
 
@@ -26,8 +25,9 @@ class GnustepBaseRecipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
-        apply_conandata_patches(self)
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
+            apply_conandata_patches(self)
 
     def requirements(self):
         if self.options.objc_runtime == "ng":
@@ -44,12 +44,34 @@ class GnustepBaseRecipe(ConanFile):
         self.requires("icu/77.1")
         self.requires("libcurl/8.12.1")
         self.requires("libiconv/1.17")
+
+        # Link an alternative allocator, if configured
+        self.python_requires["gnustep-helpers"].module.requires_allocator(self)
+
+        # The profile data for profile-guided optimization, if configured
+        self.python_requires["gnustep-helpers"].module.requires_pgo_profile(self)
+
         self.tool_requires("gnustep-make/[^2.9.3]")
 
     def config_options(self):
         if self.settings.os == "Windows":
             self.options.rm_safe("fPIC")
 
+    def validate(self):
+        self.python_requires["gnustep-helpers"].module.validate_lto(self)
+        self.python_requires["gnustep-helpers"].module.validate_pgo(self)
+        self.python_requires["gnustep-helpers"].module.validate_static_runtime(self)
+        self.python_requires["gnustep-helpers"].module.validate_allocator(self)
+        self.python_requires["gnustep-helpers"].module.validate_modules(self)
+        self.python_requires["gnustep-helpers"].module.validate_split_debug_info(self)
+
+    def configure(self):
+        # Build a static bundle of libobjc2, libdispatch and gnustep-base, if configured
+        self.python_requires["gnustep-helpers"].module.configure_static_runtime(self)
+
+        # Use the same allocator in libobjc2
+        self.python_requires["gnustep-helpers"].module.configure_allocator(self)
+
     def build_requirements(self):
         # Require a MSYS2 shell on Windows (for Autotools support)
         self.python_requires["gnustep-helpers"].module.windows_build_requirements(self)
@@ -104,6 +126,24 @@ class GnustepBaseRecipe(ConanFile):
         # On Windows, use a copy of pkgconf which ships via Conan
         self.python_requires["gnustep-helpers"].module.configure_windows_pkgconf(self, env)
 
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_compiler_cache(self, tc, env)
+
+        # Enable link-time optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_lto(self, tc, env)
+
+        # Enable profile-guided optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_pgo(self, env)
+
+        # Place each function in its own section, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_function_sections(self, env)
+
+        # Build with debug info which is split off when packaging, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_split_debug_info(self, env)
+
+        # Build in parallel, honoring tools.build:jobs
+        self.python_requires["gnustep-helpers"].module.configure_parallel_make(self, tc)
+
         # On Windows, running the test requires the Source/obj folder to be in PATH, not just LD_LIBRARY_PATH
         if self.settings.os == "Windows":
             env.append_path("PATH", os.path.join(self.build_folder, "Source/obj"))
@@ -120,73 +160,101 @@ class GnustepBaseRecipe(ConanFile):
         def yes_no(opt): return "yes" if opt else "no"
 
         autotools = Autotools(self)
-        autotools.configure()
-        autotools.make()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            autotools.configure()
+        self.python_requires["gnustep-helpers"].module.gnustep_make(self, autotools)
 
         if not self.conf.get("tools.build:skip_test", default=False):
             # Build tests for release to match CRT of DLLs (for Windows compatibility).
             test_with_debug=yes_no(self.settings.build_type == "Debug")
-            autotools.make(
-                target="check",
-                args=[f"GSMAKEOPTIONS='debug={test_with_debug}'"])
 
-    @property
-    def _pc_data_path(self):
-        return os.path.join(self.package_folder, "res", "pc_data.yml")
+            # Use -c user.gnustep:tests=sharded to run the test suite in parallel, or -c user.gnustep:tests=smoke to
+            # run only a subset of the tests (in parallel, too).
+            tests = self.conf.get("user.gnustep:tests", default="make", check_type=str, choices=["make", "sharded", "smoke"])
+
+            if tests == "make":
+                self.python_requires["gnustep-helpers"].module.gnustep_make(
+                    self,
+                    autotools,
+                    target="check",
+                    args=[f"GSMAKEOPTIONS='debug={test_with_debug}'"])
+            else:
+                self.python_requires["gnustep-helpers"].module.run_gnustep_tests(
+                    self,
+                    os.path.join(self.build_folder, "Tests"),
+                    "base",
+                    self._test_environment(test_with_debug),
+                    directories=self._smoke_tests if tests == "smoke" else None)
+
+    # A subset of the test suite which covers the most commonly used classes, and which runs quickly
+    _smoke_tests = [
+        "NSArray",
+        "NSAutoreleasePool",
+        "NSData",
+        "NSDictionary",
+        "NSException",
+        "NSJSONSerialization",
+        "NSNumber",
+        "NSObject",
+        "NSString",
+    ]
+
+    def _test_environment(self, test_with_debug):
+        # Mirrors the environment which the check target in the libs-base GNUmakefile sets up for gnustep-tests,
+        # so the tests compile and link against the copy of gnustep-base in the build folder
+        build_folder = self.build_folder
+        if self.settings.os == "Windows":
+            build_folder = build_folder.replace('\\','/')
+            build_folder = build_folder.replace('C:','/c')
+
+        env = Environment()
+        env.define("GNUSTEP_MAKEFILES", self.get_makefiles_folder())
+        env.define("GSMAKEOPTIONS", f"debug={test_with_debug}")
+        env.define("GNUSTEP_LOCAL_ADDITIONAL_MAKEFILES", f"{build_folder}/base.make")
+        env.define("ADDITIONAL_INCLUDE_DIRS", f"-I{build_folder}/Headers -I{build_folder}/Source")
+        env.define("ADDITIONAL_LIB_DIRS", f"-L{build_folder}/Source/obj")
+        env.prepend_path("LD_LIBRARY_PATH", os.path.join(self.build_folder, "Source/obj"))
+        return env
 
     def package(self):
         autotools = Autotools(self)
-        autotools.install()
-
-        # Make install copies the additional makefiles into $DESTDIR/${gnustep_make_package_folder}/share/GNUstep/Makefiles/,
-        # but gnustep_make_package_folder is a fully qualified path (/home/user/.conan/p/b/{package}/p/share/GNUstep/Makefiles/);
-        # we fix that here.  This always runs in a GNU-like context (Linux or MSYS), so we can assume Unix paths.
-        src = os.path.join(self.package_folder, self.get_makefiles_folder()[1:], "Additional")
-        dst = os.path.join(self.package_folder, "share/GNUstep/Makefiles/Additional/")
-        copy(
-            self,
-            "*.make",
-            src=src,
-            dst = dst)
-        
-        if self.settings.os == "Windows":
-            rmdir(self, os.path.join(self.package_folder, "c"))
-        else:
-            rmdir(self, os.path.join(self.package_folder, "home"))
-        
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            autotools.install()
+
+        # Move the additional makefiles (base.make), which make install puts in $DESTDIR/$GNUSTEP_MAKEFILES/Additional/
+        self.python_requires["gnustep-helpers"].module.package_additional_makefiles(self, self.get_makefiles_folder())
+
         # Extract compiler options, and cache them for use by package_info
-        pkg_config_path = os.path.join(self.package_folder, "lib", "pkgconfig").replace('\\','/').replace('C:','/c')
-        pkg_config = PkgConfig(self, "gnustep-base", pkg_config_path)
-
-        pc_data = {
-            "cflags": [],
-            "defines": []
-        }
-
-        cflags = ["-fexceptions", "-fobjc-exceptions", "-fobjc-runtime=", "-fblocks"]
-        for cflag in cflags:
-            value = next((x for x in pkg_config.cflags if x.startswith(cflag)),None)
-            if value:
-                pc_data["cflags"].append(value)
-
-        # Export the defines which influence the behavior of GNUstep, but prevent generic defines,
-        # such as NDEBUG or GSWARN and GSDIAGNOSE from being exported here; the user should be in control of those.
-        defines = ["GNUSTEP_RUNTIME", "_NONFRAGILE_ABI", "GNUSTEP_BASE_LIBRARY", "GNUSTEP_WITH_DLL", "_NATIVE_OBJC_EXCEPTIONS"]
-        for define in defines:
-            value = next((x for x in pkg_config.defines if x.startswith(define)),None)
-            if value:
-                pc_data["defines"].append(value)
-
-        mkdir(self, os.path.dirname(self._pc_data_path))
-        save(self, self._pc_data_path, yaml.dump(pc_data))
+        self.python_requires["gnustep-helpers"].module.package_pc_data(self, "gnustep-base")
 
-    def package_info(self):
-        pc_data = yaml.safe_load(load(self, self._pc_data_path))
+        # Ship a clang module map for Foundation, if configured
+        self.python_requires["gnustep-helpers"].module.package_module_map(self, "Foundation", "Foundation.h", requires=["libobjc2", "libdispatch"])
+
+        # Move the debug info to the metadata folder, if configured
+        self.python_requires["gnustep-helpers"].module.package_split_debug_info(self)
 
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
+
+    def package_info(self):
         self.cpp_info.libs = ["gnustep-base"]
-        self.cpp_info.defines.extend(pc_data["defines"])
-        self.cpp_info.cflags.extend(pc_data["cflags"])
+
+        # With the static runtime, make sure all classes and categories in gnustep-base and libobjc2 are loaded
+        self.python_requires["gnustep-helpers"].module.package_info_whole_archive(self, "gnustep-base")
+        if not self.options.shared and self.settings.os in ["Linux", "FreeBSD"]:
+            self.cpp_info.system_libs = ["pthread", "dl", "m"]
+
+        self.python_requires["gnustep-helpers"].module.package_info_pc_data(self)
+        self.python_requires["gnustep-helpers"].module.package_info_lto(self)
+        self.python_requires["gnustep-helpers"].module.package_info_pgo(self)
+        self.python_requires["gnustep-helpers"].module.package_info_allocator(self)
+        self.python_requires["gnustep-helpers"].module.package_info_module_map(self, "Foundation")
         
         if self.options.objc_runtime == "gnu":
             self.cpp_info.cflags.append("-fconstant-string-class=NSConstantString")
-            self.cpp_info.system_libs = ["objc"]
+            self.cpp_info.system_libs.append("objc")
@@ -0,0 +1,263 @@
+#import <Foundation/Foundation.h>
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <string.h>
+
+#include "bench.h"
+
+// Allocation benchmarks for gnustep-base, to compare the allocators which can be selected using the allocator
+// option: the throughput of allocating and releasing objects on one and on multiple threads, and the resident set
+// size while a multi-threaded workload keeps a mix of short- and long-lived objects of different sizes alive.  The
+// results are written as JSON (see bench.h).
+//
+// Before running the benchmarks, this checks that malloc is actually served by the selected allocator, so a build
+// which silently falls back to the system allocator doesn't produce misleading results.
+
+#ifndef GNUSTEP_ALLOCATOR
+#define GNUSTEP_ALLOCATOR "system"
+#endif
+
+// Returns the resident set size of this process in megabytes, or 0 if it's not known
+static double rss_mb(void)
+{
+    double rss = 0;
+#ifdef __linux__
+    FILE *statm = fopen("/proc/self/statm", "r");
+    long size, resident;
+    if (statm)
+    {
+        if (fscanf(statm, "%ld %ld", &size, &resident) == 2)
+        {
+            rss = (double)resident * (double)sysconf(_SC_PAGESIZE) / (1024 * 1024);
+        }
+        fclose(statm);
+    }
+#endif
+    return rss;
+}
+
+static volatile NSUInteger sink;
+
+// Functions of the allocators, which are only defined when the allocator is linked
+extern bool mi_is_in_heap_region(const void *p) __attribute__((weak));
+extern int mallctl(const char *name, void *oldp, size_t *oldlenp, void *newp, size_t newlen) __attribute__((weak));
+
+static void *volatile probe;
+
+// Returns true if malloc is served by the allocator the program was built for
+static bool is_allocator_active(const char *allocator)
+{
+    if (strcmp(allocator, "mimalloc") == 0)
+    {
+        if (!mi_is_in_heap_region)
+        {
+            return false;
+        }
+
+        probe = malloc(64);
+        bool active = mi_is_in_heap_region(probe);
+        free(probe);
+        return active;
+    }
+
+    if (strcmp(allocator, "jemalloc") == 0)
+    {
+        if (!mallctl)
+        {
+            return false;
+        }
+
+        // jemalloc counts the bytes which are allocated by each thread
+        uint64_t before = 0, after = 0;
+        size_t size = sizeof(uint64_t);
+        mallctl("thread.allocated", &before, &size, NULL, 0);
+        probe = malloc(1024 * 1024);
+        mallctl("thread.allocated", &after, &size, NULL, 0);
+        free(probe);
+        return after > before;
+    }
+
+    return true;
+}
+
+// A simple linear congruential generator, so all runs use the same sequence of sizes
+static unsigned next_random(unsigned *state)
+{
+    *state = *state * 1103515245 + 12345;
+    return *state >> 8;
+}
+
+#define LIVE_OBJECTS 4096
+#define RSS_SAMPLES 10
+
+static long worker_iterations;
+static NSCondition *done_condition;
+static int running_workers;
+static double rss_samples[RSS_SAMPLES];
+
+@interface AllocationWorker : NSObject
++ (void) run: (NSNumber *)seed;
+@end
+
+@implementation AllocationWorker
++ (void) run: (NSNumber *)seed
+{
+    NSAutoreleasePool *outer = [NSAutoreleasePool new];
+    unsigned state = [seed unsignedIntValue];
+
+    // A ring of long-lived objects; each iteration replaces a random one, and allocates some temporaries
+    id *live = calloc(LIVE_OBJECTS, sizeof(id));
+
+    for (long i = 0; i < worker_iterations; i++)
+    {
+        NSAutoreleasePool *pool = [NSAutoreleasePool new];
+        unsigned slot = next_random(&state) % LIVE_OBJECTS;
+        unsigned size = 16 + next_random(&state) % 4096;
+
+        [live[slot] release];
+        if (next_random(&state) & 1)
+        {
+            live[slot] = [[NSMutableData alloc] initWithLength: size];
+        }
+        else
+        {
+            live[slot] = [[NSString alloc] initWithFormat: @"object %u of size %u", slot, size];
+        }
+
+        sink += [[NSString stringWithFormat: @"temporary %ld", i] length];
+        sink += [[NSArray arrayWithObjects: live[slot], live[(slot + 1) % LIVE_OBJECTS], nil] count];
+        [pool drain];
+
+        // The first worker samples the resident set size
+        if ([seed unsignedIntValue] == 1 && worker_iterations >= RSS_SAMPLES && i % (worker_iterations / RSS_SAMPLES) == 0)
+        {
+            long sample = i / (worker_iterations / RSS_SAMPLES);
+            if (sample < RSS_SAMPLES)
+            {
+                rss_samples[sample] = rss_mb();
+            }
+        }
+    }
+
+    for (int i = 0; i < LIVE_OBJECTS; i++)
+    {
+        [live[i] release];
+    }
+    free(live);
+
+    [done_condition lock];
+    running_workers--;
+    [done_condition signal];
+    [done_condition unlock];
+    [outer drain];
+}
+@end
+
+static void bench_single_thread(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSData *data = [[NSMutableData alloc] initWithLength: 64];
+        sink += [data length];
+        [data release];
+    }
+    bench_report("alloc_free_64_bytes", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSData *data = [[NSMutableData alloc] initWithLength: 16 + (i % 64) * 64];
+        sink += [data length];
+        [data release];
+    }
+    bench_report("alloc_free_mixed_sizes", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations / 100; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        for (int j = 0; j < 100; j++)
+        {
+            sink += [[NSString stringWithFormat: @"%d", j] length];
+        }
+        [inner drain];
+    }
+    bench_report("autoreleased_strings", (iterations / 100) * 100, 1, bench_now_ns() - start);
+
+    [pool drain];
+}
+
+static void bench_threads(long iterations, int threads)
+{
+    worker_iterations = iterations;
+    done_condition = [NSCondition new];
+    running_workers = threads;
+
+    double start = bench_now_ns();
+    for (int i = 0; i < threads; i++)
+    {
+        [NSThread detachNewThreadSelector: @selector(run:)
+                                 toTarget: [AllocationWorker class]
+                               withObject: [NSNumber numberWithUnsignedInt: i + 1]];
+    }
+
+    [done_condition lock];
+    while (running_workers > 0)
+    {
+        [done_condition wait];
+    }
+    [done_condition unlock];
+
+    char name[64];
+    snprintf(name, sizeof(name), "mixed_workload_%d_threads", threads);
+    bench_report(name, iterations * threads, threads, bench_now_ns() - start);
+
+    [done_condition release];
+}
+
+int main(int argc, char **argv)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    long iterations = bench_iterations(argc, argv, 1000000);
+    int threads = (int)[[NSProcessInfo processInfo] activeProcessorCount];
+
+    if (threads > 16)
+    {
+        threads = 16;
+    }
+
+    if (!is_allocator_active(GNUSTEP_ALLOCATOR))
+    {
+        fprintf(stderr, "This program was built for the %s allocator, but malloc is not served by it\n", GNUSTEP_ALLOCATOR);
+        return EXIT_FAILURE;
+    }
+
+    if (!bench_begin(argc, argv))
+    {
+        return EXIT_FAILURE;
+    }
+    bench_emit("\n  \"allocator\": \"%s\",", GNUSTEP_ALLOCATOR);
+
+    bench_begin_results();
+    bench_single_thread(iterations);
+    bench_threads(iterations / 10, 1);
+    bench_threads(iterations / 10, threads);
+    bench_end_results();
+
+    // The resident set size over the course of the multi-threaded workload, and at the end
+    bench_emit(",\n  \"rss_mb\": [");
+    for (int i = 0; i <= RSS_SAMPLES; i++)
+    {
+        bench_emit("%s%.1f", i == 0 ? "" : ", ", i < RSS_SAMPLES ? rss_samples[i] : rss_mb());
+    }
+    bench_emit("]");
+
+    bench_end();
+
+    [pool drain];
+    return EXIT_SUCCESS;
+}
@@ -0,0 +1,331 @@
+#import <Foundation/Foundation.h>
+
+#include "bench.h"
+
+// Throughput benchmarks for commonly used Foundation classes: strings (which are backed by ICU), collections,
+// NSData, JSON and property list serialization, XML parsing (which is backed by libxml2), autorelease pools and
+// exceptions.  The results are written as JSON (see bench.h).
+
+static volatile NSUInteger sink;
+
+@interface BenchParserDelegate : NSObject
+{
+@public
+    NSUInteger elements;
+}
+@end
+
+@implementation BenchParserDelegate
+- (void) parser: (NSXMLParser *)parser
+didStartElement: (NSString *)elementName
+   namespaceURI: (NSString *)namespaceURI
+  qualifiedName: (NSString *)qualifiedName
+     attributes: (NSDictionary *)attributeDict
+{
+    elements++;
+}
+@end
+
+static void bench_strings(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    const char *utf8 = "Gr\xc3\xbc\xc3\x9f" "e aus GNUstep, \xe3\x81\x93\xe3\x82\x93\xe3\x81\xab\xe3\x81\xa1\xe3\x81\xaf";
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSString *string = [[NSString alloc] initWithUTF8String: utf8];
+        sink += [string length];
+        [string release];
+    }
+    bench_report("string_create_utf8", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSString *string = [[NSString alloc] initWithFormat: @"key-%ld", i];
+        sink += [string length];
+        [string release];
+    }
+    bench_report("string_create_format", iterations, 1, bench_now_ns() - start);
+
+    NSString *string = [NSString stringWithUTF8String: utf8];
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSString *copy = [string mutableCopy];
+        sink += [copy hash];
+        [copy release];
+    }
+    bench_report("string_hash", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        sink += (NSUInteger)[string UTF8String];
+        [inner drain];
+    }
+    bench_report("string_to_utf8", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        sink += [[string uppercaseString] length];
+        [inner drain];
+    }
+    bench_report("string_uppercase", iterations, 1, bench_now_ns() - start);
+
+    NSString *other = [string uppercaseString];
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += [string caseInsensitiveCompare: other];
+    }
+    bench_report("string_case_insensitive_compare", iterations, 1, bench_now_ns() - start);
+
+    [pool drain];
+}
+
+static void bench_collections(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    NSMutableArray *keys = [NSMutableArray arrayWithCapacity: iterations];
+
+    for (long i = 0; i < iterations; i++)
+    {
+        [keys addObject: [NSString stringWithFormat: @"key-%ld", i]];
+    }
+
+    NSMutableArray *array = [NSMutableArray array];
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        [array addObject: [keys objectAtIndex: i]];
+    }
+    bench_report("array_insert", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (id object in array)
+    {
+        sink += (NSUInteger)object;
+    }
+    bench_report("array_enumerate", iterations, 1, bench_now_ns() - start);
+
+    NSMutableDictionary *dictionary = [NSMutableDictionary dictionary];
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        id key = [keys objectAtIndex: i];
+        [dictionary setObject: key forKey: key];
+    }
+    bench_report("dictionary_insert", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (NSUInteger)[dictionary objectForKey: [keys objectAtIndex: i]];
+    }
+    bench_report("dictionary_lookup", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (id key in dictionary)
+    {
+        sink += (NSUInteger)[dictionary objectForKey: key];
+    }
+    bench_report("dictionary_enumerate", iterations, 1, bench_now_ns() - start);
+
+    [pool drain];
+}
+
+static void bench_data(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    char bytes[256];
+    for (int i = 0; i < 256; i++)
+    {
+        bytes[i] = (char)i;
+    }
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSData *data = [[NSData alloc] initWithBytes: bytes length: sizeof(bytes)];
+        sink += [data length];
+        [data release];
+    }
+    bench_report("data_create_256", iterations, 1, bench_now_ns() - start);
+
+    NSMutableData *data = [NSMutableData data];
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        [data appendBytes: bytes length: 16];
+    }
+    bench_report("data_append_16", iterations, 1, bench_now_ns() - start);
+
+    [pool drain];
+}
+
+static id sample_document(void)
+{
+    NSMutableArray *items = [NSMutableArray array];
+    for (int i = 0; i < 100; i++)
+    {
+        [items addObject: [NSDictionary dictionaryWithObjectsAndKeys:
+            [NSNumber numberWithInt: i], @"id",
+            [NSString stringWithFormat: @"item %d", i], @"name",
+            [NSNumber numberWithDouble: i * 1.5], @"price",
+            nil]];
+    }
+
+    return [NSDictionary dictionaryWithObjectsAndKeys: items, @"items", @"GNUstep", @"source", nil];
+}
+
+static void bench_serialization(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    id document = sample_document();
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        sink += [[NSJSONSerialization dataWithJSONObject: document options: 0 error: NULL] length];
+        [inner drain];
+    }
+    bench_report("json_serialize", iterations, 1, bench_now_ns() - start);
+
+    NSData *json = [NSJSONSerialization dataWithJSONObject: document options: 0 error: NULL];
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        sink += [[NSJSONSerialization JSONObjectWithData: json options: 0 error: NULL] count];
+        [inner drain];
+    }
+    bench_report("json_parse", iterations, 1, bench_now_ns() - start);
+
+    NSPropertyListFormat formats[2] = { NSPropertyListXMLFormat_v1_0, NSPropertyListBinaryFormat_v1_0 };
+    const char *names[2][2] = {
+        { "plist_xml_serialize", "plist_xml_parse" },
+        { "plist_binary_serialize", "plist_binary_parse" }
+    };
+
+    for (int f = 0; f < 2; f++)
+    {
+        start = bench_now_ns();
+        for (long i = 0; i < iterations; i++)
+        {
+            NSAutoreleasePool *inner = [NSAutoreleasePool new];
+            sink += [[NSPropertyListSerialization dataWithPropertyList: document format: formats[f] options: 0 error: NULL] length];
+            [inner drain];
+        }
+        bench_report(names[f][0], iterations, 1, bench_now_ns() - start);
+
+        NSData *plist = [NSPropertyListSerialization dataWithPropertyList: document format: formats[f] options: 0 error: NULL];
+        start = bench_now_ns();
+        for (long i = 0; i < iterations; i++)
+        {
+            NSAutoreleasePool *inner = [NSAutoreleasePool new];
+            sink += [[NSPropertyListSerialization propertyListWithData: plist options: 0 format: NULL error: NULL] count];
+            [inner drain];
+        }
+        bench_report(names[f][1], iterations, 1, bench_now_ns() - start);
+    }
+
+    [pool drain];
+}
+
+static void bench_xml(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    NSMutableString *xml = [NSMutableString stringWithString: @"<?xml version=\"1.0\"?><items>"];
+    for (int i = 0; i < 100; i++)
+    {
+        [xml appendFormat: @"<item id=\"%d\"><name>item %d</name></item>", i, i];
+    }
+    [xml appendString: @"</items>"];
+    NSData *data = [xml dataUsingEncoding: NSUTF8StringEncoding];
+
+    BenchParserDelegate *delegate = [BenchParserDelegate new];
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *inner = [NSAutoreleasePool new];
+        NSXMLParser *parser = [[NSXMLParser alloc] initWithData: data];
+        [parser setDelegate: delegate];
+        [parser parse];
+        [parser release];
+        [inner drain];
+    }
+    bench_report("xml_parse", iterations, 1, bench_now_ns() - start);
+
+    sink += delegate->elements;
+    [delegate release];
+    [pool drain];
+}
+
+static void bench_autorelease(long iterations)
+{
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        NSAutoreleasePool *pool = [NSAutoreleasePool new];
+        for (int j = 0; j < 10; j++)
+        {
+            [[[NSObject alloc] init] autorelease];
+        }
+        [pool drain];
+    }
+    bench_report("autorelease_pool_10_objects", iterations, 1, bench_now_ns() - start);
+}
+
+static void bench_exceptions(long iterations)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    NSException *exception = [NSException exceptionWithName: NSGenericException reason: @"benchmark" userInfo: nil];
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        @try
+        {
+            @throw exception;
+        }
+        @catch (NSException *e)
+        {
+            sink++;
+        }
+    }
+    bench_report("exception_throw_catch", iterations, 1, bench_now_ns() - start);
+
+    [pool drain];
+}
+
+int main(int argc, char **argv)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    long iterations = bench_iterations(argc, argv, 100000);
+
+    if (!bench_begin(argc, argv))
+    {
+        return EXIT_FAILURE;
+    }
+
+    bench_begin_results();
+    bench_strings(iterations);
+    bench_collections(iterations);
+    bench_data(iterations);
+    bench_serialization(iterations / 100);
+    bench_xml(iterations / 100);
+    bench_autorelease(iterations);
+    bench_exceptions(iterations / 10);
+    bench_end_results();
+
+    bench_end();
+
+    [pool drain];
+    return EXIT_SUCCESS;
+}
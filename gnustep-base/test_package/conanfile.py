@@ -1,13 +1,19 @@
 from conan import ConanFile
 from conan.tools.build import can_run
-from conan.tools.cmake import cmake_layout, CMake
+from conan.tools.cmake import cmake_layout, CMake, CMakeToolchain
 import os
 
 class TestPackageConan(ConanFile):
     settings = "os", "arch", "compiler", "build_type"
-    generators = "CMakeDeps", "CMakeToolchain"
+    generators = "CMakeDeps"
     options = {"objc_runtime": ["gnu", "ng"]}
     default_options = {"objc_runtime": "ng"}
+    python_requires = "gnustep-helpers/0.1"
+
+    @property
+    def _benchmark(self):
+        # Use -c user.gnustep:benchmark=True to run the Foundation, startup and allocator benchmarks, too
+        return self.python_requires["gnustep-helpers"].module.is_benchmark_enabled(self)
 
     def layout(self):
         cmake_layout(self)
@@ -18,6 +24,12 @@ class TestPackageConan(ConanFile):
         if self.options.objc_runtime == "ng":
             self.requires("libobjc2/[^2.2.1]")
 
+    def generate(self):
+        tc = CMakeToolchain(self)
+        self.python_requires["gnustep-helpers"].module.configure_cmake_benchmark(self, tc)
+        tc.cache_variables["GNUSTEP_ALLOCATOR"] = str(self.dependencies["gnustep-base"].options.allocator)
+        tc.generate()
+
     def build(self):
         cmake = CMake(self)
         cmake.configure()
@@ -27,3 +39,17 @@ class TestPackageConan(ConanFile):
         if can_run(self):
             bin_path = os.path.join(self.cpp.build.bindir, "test_package")
             self.run(bin_path, env="conanrun")
+
+            if self.settings.os != "Windows":
+                library_consumer_path = os.path.join(self.cpp.build.bindir, "test_library_consumer")
+                self.run(library_consumer_path, env="conanrun")
+
+            if self._benchmark:
+                benchmark_path = os.path.join(self.cpp.build.bindir, "benchmark")
+                self.python_requires["gnustep-helpers"].module.run_benchmark(self, benchmark_path)
+
+                startup_path = os.path.join(self.cpp.build.bindir, "startup")
+                self.python_requires["gnustep-helpers"].module.run_startup_benchmark(self, startup_path)
+
+                allocator_path = os.path.join(self.cpp.build.bindir, "allocator")
+                self.python_requires["gnustep-helpers"].module.run_benchmark(self, allocator_path, name="allocator")
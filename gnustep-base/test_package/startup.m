@@ -0,0 +1,71 @@
+#import <Foundation/Foundation.h>
+
+#include "bench.h"
+
+#ifdef __linux__
+#include <link.h>
+#endif
+
+// A minimal Foundation program, which measures how long it takes to start.  The process which launches this program
+// passes the time at which it was launched (on the monotonic clock, in nanoseconds) in the STARTUP_LAUNCH_NS
+// environment variable.  The program prints a single line of JSON to stdout, with the time (relative to the launch)
+// at which
+// - the +load method of a class in this program ran, after the runtime and gnustep-base were loaded and initialized
+// - main was entered
+// - the first Foundation objects were initialized (+initialize of NSAutoreleasePool, NSProcessInfo and NSString)
+// - the first NSLog call returned
+// and the shared objects which are loaded into the process (on Linux).
+
+static double load_ns;
+
+@interface StartupProbe : NSObject
+@end
+
+@implementation StartupProbe
++ (void) load
+{
+    load_ns = bench_now_ns();
+}
+@end
+
+#ifdef __linux__
+static int print_object(struct dl_phdr_info *info, size_t size, void *data)
+{
+    int *count = data;
+
+    // The main program and the vDSO have no (or a virtual) file name
+    if (info->dlpi_name[0] != '/')
+    {
+        return 0;
+    }
+
+    bench_emit("%s\"%s\"", (*count)++ == 0 ? "" : ", ", info->dlpi_name);
+    return 0;
+}
+#endif
+
+int main(int argc, char **argv)
+{
+    double main_ns = bench_now_ns();
+    const char *launch = getenv("STARTUP_LAUNCH_NS");
+    double launch_ns = launch ? atof(launch) : main_ns;
+
+    double initialize_start_ns = bench_now_ns();
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+    NSString *name = [[NSProcessInfo processInfo] processName];
+    double initialize_ns = bench_now_ns() - initialize_start_ns;
+
+    NSLog(@"%@ started", name);
+    double nslog_ns = bench_now_ns();
+
+    bench_emit("{\"load_ns\": %.0f, \"main_ns\": %.0f, \"initialize_ns\": %.0f, \"first_nslog_ns\": %.0f, \"objects\": [",
+        load_ns - launch_ns, main_ns - launch_ns, initialize_ns, nslog_ns - launch_ns);
+#ifdef __linux__
+    int count = 0;
+    dl_iterate_phdr(print_object, &count);
+#endif
+    bench_emit("]}\n");
+
+    [pool drain];
+    return EXIT_SUCCESS;
+}
@@ -0,0 +1,18 @@
+#import <Foundation/Foundation.h>
+
+// A shared library which uses gnustep-base, to test linking gnustep-base into a shared library (e.g. a bundle or
+// framework); with the static runtime, gnustep-base and libobjc2 are linked into this library.
+int test_library_run(void)
+{
+    NSAutoreleasePool *pool = [NSAutoreleasePool new];
+
+    // Classes and categories are only registered if their object files were linked, so use a few of them
+    NSString *string = [NSString stringWithFormat: @"%d", 42];
+    NSArray *array = [NSArray arrayWithObjects: string, @"Hello", nil];
+    int result = [[array objectAtIndex: 0] intValue] == 42 && [array count] == 2;
+
+    NSLog(@"Hello from a shared library: %@", array);
+
+    [pool drain];
+    return result;
+}
@@ -0,0 +1,16 @@
+#include <stdio.h>
+#include <stdlib.h>
+
+int test_library_run(void);
+
+// An executable which only links the test library, not gnustep-base itself
+int main(void)
+{
+    if (!test_library_run())
+    {
+        fprintf(stderr, "The test library failed\n");
+        return EXIT_FAILURE;
+    }
+
+    return EXIT_SUCCESS;
+}
@@ -1,11 +1,9 @@
 from conan import ConanFile
 from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain, PkgConfigDeps
-from conan.tools.files import get, apply_conandata_patches, mkdir, replace_in_file, copy, rmdir
+from conan.tools.files import apply_conandata_patches, replace_in_file
 from conan.tools.build import cross_building
 from conan.tools.env import VirtualRunEnv
-from pathlib import Path
 import os
-import shutil
 
 class GnustepGuiRecipe(ConanFile):
     name = "gnustep-gui"
@@ -17,8 +15,8 @@ class GnustepGuiRecipe(ConanFile):
     
     # Binary configuration
     settings = "os", "compiler", "build_type", "arch"
-    options = {"shared": [True, False], "fPIC": [True, False], "objc_runtime": ["gnu", "ng"]}
-    default_options = {"shared": True, "fPIC": True, "objc_runtime": "ng"}
+    options = {"shared": [True, False], "fPIC": [True, False], "objc_runtime": ["gnu", "ng"], "lto": ["off", "thin", "full"], "split_debug_info": [True, False]}
+    default_options = {"shared": True, "fPIC": True, "objc_runtime": "ng", "lto": "off", "split_debug_info": False}
     exports_sources = "*.patch"
     python_requires = "gnustep-helpers/0.1"
 
@@ -26,8 +24,9 @@ class GnustepGuiRecipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
-        apply_conandata_patches(self)
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
+            apply_conandata_patches(self)
 
     def requirements(self):
         self.requires("gnustep-base/[^1.31.1]")
@@ -42,6 +41,10 @@ class GnustepGuiRecipe(ConanFile):
         if self.settings.os == "Windows":
             self.options.rm_safe("fPIC")
 
+    def validate(self):
+        self.python_requires["gnustep-helpers"].module.validate_lto(self)
+        self.python_requires["gnustep-helpers"].module.validate_split_debug_info(self)
+
     def build_requirements(self):
         # Require a MSYS2 shell on Windows (for Autotools support)
         self.python_requires["gnustep-helpers"].module.windows_build_requirements(self)
@@ -55,6 +58,20 @@ class GnustepGuiRecipe(ConanFile):
 
         return full_folder_path
 
+    def get_dependency_makefiles(self):
+        # The dependencies which contain GNUstep makefiles (in share/GNUstep/Makefiles), in the order in which they're merged
+        return [self.dependencies.build["gnustep-make"], self.dependencies["gnustep-base"]]
+
+    def get_makefiles_folder(self):
+        # The folder into which the GNUstep makefiles of all dependencies are merged
+        build_makefiles = self.python_requires["gnustep-helpers"].module.get_merged_makefiles_folder(self, self.get_dependency_makefiles())
+
+        if self.settings.os == "Windows":
+            build_makefiles = build_makefiles.replace('\\','/')
+            build_makefiles = build_makefiles.replace('C:','/c')
+
+        return build_makefiles
+
     def generate(self):
         if not cross_building(self):
             # Expose LD_LIBRARY_PATH when there are shared dependencies,
@@ -67,19 +84,9 @@ class GnustepGuiRecipe(ConanFile):
 
         # The GNUstep makefiles are stored in the gnustep-make and gnustep-base package (gnustep-base
         # deploys a single makefile, but that contains additional preprocessor definitions which are
-        # needed).
-        # The GNUstep filesystem doesn't deal with this layout very well, so create a single directory
-        # into which we merge both file systems
-        gnustep_make_makefiles = os.path.join(self.dependencies.build["gnustep-make"].package_folder, "share/GNUstep/Makefiles/")
-        gnustep_base_makefiles = os.path.join(self.dependencies["gnustep-base"].package_folder, "share/GNUstep/Makefiles")
-        build_makefiles = os.path.join(self.build_folder, "build/Makefiles")
-        mkdir(self, build_makefiles)
-        shutil.copytree(gnustep_make_makefiles, build_makefiles, dirs_exist_ok=True)
-        shutil.copytree(gnustep_base_makefiles, build_makefiles, dirs_exist_ok=True)
-
-        if self.settings.os == "Windows":
-            build_makefiles = build_makefiles.replace('\\','/')
-            build_makefiles = build_makefiles.replace('C:','/c')
+        # needed).  Merge both into a single folder.
+        self.python_requires["gnustep-helpers"].module.merge_makefiles(self, self.get_dependency_makefiles())
+        build_makefiles = self.get_makefiles_folder()
 
         # Resolve GNUstep makefiles
         tc.configure_args.append(f"GNUSTEP_MAKEFILES={build_makefiles}")
@@ -104,6 +111,12 @@ class GnustepGuiRecipe(ConanFile):
             libobjc2_lib = self.get_package_folder("libobjc2", "lib/")
             ldflags += (f" -L{dispatch_lib} -L{libobjc2_lib}")
 
+        # ALL_LDFLAGS overrides LDFLAGS, so pass the link-time optimization and debug info flags here, too
+        _, lto_link_flags = self.python_requires["gnustep-helpers"].module.get_lto_flags(self)
+        _, debug_info_link_flags = self.python_requires["gnustep-helpers"].module.get_split_debug_info_flags(self)
+        for flag in lto_link_flags + debug_info_link_flags:
+            ldflags += f" {flag}"
+
         tc.make_args.append(ldflags)
 
         if self.settings.os != "Windows":
@@ -124,6 +137,18 @@ class GnustepGuiRecipe(ConanFile):
         # On Windows, use a copy of pkgconf which ships via Conan
         self.python_requires["gnustep-helpers"].module.configure_windows_pkgconf(self, env)
 
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_compiler_cache(self, tc, env)
+
+        # Enable link-time optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_lto(self, tc, env)
+
+        # Build with debug info which is split off when packaging, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_split_debug_info(self, env)
+
+        # Build in parallel, honoring tools.build:jobs
+        self.python_requires["gnustep-helpers"].module.configure_parallel_make(self, tc)
+
         if self.settings.os == "Windows":
             # The Conan packages for libjpeg ship with a library named libjpeg.lib (as opposed to jpeg.lib);
             # account for this by using -llibjpeg instead of -ljpeg.
@@ -146,30 +171,33 @@ class GnustepGuiRecipe(ConanFile):
 
     def build(self):
         autotools = Autotools(self)
-        autotools.configure()
-        autotools.make()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            autotools.configure()
+        self.python_requires["gnustep-helpers"].module.gnustep_make(self, autotools)
 
     def package(self):
         autotools = Autotools(self)
-        autotools.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            autotools.install()
 
-        # Make install copies the additional makefiles into $DESTDIR/${gnustep_make_package_folder}/share/GNUstep/Makefiles/,
-        # but gnustep_make_package_folder is a fully qualified path (/home/user/.conan/p/b/{package}/p/share/GNUstep/Makefiles/);
-        # we fix that here.  This always runs in a GNU-like context (Linux or MSYS), so we can assume Unix paths.
-        # There may be a prefix to /home (e.g. /github/home in GitHub Actions).  On Windows, there may be no 'home' in the path.
-        src = sorted(Path(self.package_folder).glob("**/.conan2/p/**/Makefiles/Additional"))[0]
-        dst = os.path.join(self.package_folder, "share/GNUstep/Makefiles/Additional/")
+        # Move the additional makefiles (gui.make), which make install puts in $DESTDIR/$GNUSTEP_MAKEFILES/Additional/
+        self.python_requires["gnustep-helpers"].module.package_additional_makefiles(self, self.get_makefiles_folder())
 
-        copy(
-            self,
-            "*.make",
-            src=src,
-            dst = dst)
+        # Extract compiler options, and cache them for use by package_info
+        self.python_requires["gnustep-helpers"].module.package_pc_data(self, "gnustep-gui")
 
-        if self.settings.os == "Windows":
-            rmdir(self, os.path.join(self.package_folder, "c"))
-        else:
-            rmdir(self, os.path.join(self.package_folder, "home"))
+        # Move the debug info to the metadata folder, if configured
+        self.python_requires["gnustep-helpers"].module.package_split_debug_info(self)
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
 
     def package_info(self):
         self.cpp_info.libs = ["gnustep-gui"]
+        self.python_requires["gnustep-helpers"].module.package_info_pc_data(self)
+        self.python_requires["gnustep-helpers"].module.package_info_lto(self)
@@ -1,11 +1,9 @@
 from conan import ConanFile
 from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain, PkgConfigDeps
-from conan.tools.files import get, apply_conandata_patches, mkdir, replace_in_file
+from conan.tools.files import apply_conandata_patches, replace_in_file
 from conan.tools.build import cross_building
 from conan.tools.env import VirtualRunEnv
-from pathlib import Path
 import os
-import shutil
 
 class GnustepHeadlessRecipe(ConanFile):
     name = "gnustep-headless"
@@ -26,8 +24,9 @@ class GnustepHeadlessRecipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
-        apply_conandata_patches(self)
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
+            apply_conandata_patches(self)
 
     def requirements(self):
         self.requires("gnustep-gui/[^0.32.0]")
@@ -42,6 +41,20 @@ class GnustepHeadlessRecipe(ConanFile):
         # Require a MSYS2 shell on Windows (for Autotools support)
         self.python_requires["gnustep-helpers"].module.windows_build_requirements(self)
 
+    def get_dependency_makefiles(self):
+        # The dependencies which contain GNUstep makefiles (in share/GNUstep/Makefiles), in the order in which they're merged
+        return [self.dependencies.build["gnustep-make"], self.dependencies["gnustep-base"], self.dependencies["gnustep-gui"]]
+
+    def get_makefiles_folder(self):
+        # The folder into which the GNUstep makefiles of all dependencies are merged
+        build_makefiles = self.python_requires["gnustep-helpers"].module.get_merged_makefiles_folder(self, self.get_dependency_makefiles())
+
+        if self.settings.os == "Windows":
+            build_makefiles = build_makefiles.replace('\\','/')
+            build_makefiles = build_makefiles.replace('C:','/c')
+
+        return build_makefiles
+
     def generate(self):
         if not cross_building(self):
             # Expose LD_LIBRARY_PATH when there are shared dependencies,
@@ -56,23 +69,11 @@ class GnustepHeadlessRecipe(ConanFile):
         tc.configure_args.append("--enable-graphics=headless")
         tc.configure_args.append("--enable-server=headless")
 
-        # The GNUstep makefiles are stored in the gnustep-make and gnustep-base package (gnustep-base
-        # deploys a single makefile, but that contains additional preprocessor definitions which are
-        # needed).
-        # The GNUstep filesystem doesn't deal with this layout very well, so create a single directory
-        # into which we merge both file systems
-        gnustep_make_makefiles = os.path.join(self.dependencies.build["gnustep-make"].package_folder, "share/GNUstep/Makefiles/")
-        gnustep_base_makefiles = os.path.join(self.dependencies["gnustep-base"].package_folder, "share/GNUstep/Makefiles")
-        gnustep_gui_makefiles = os.path.join(self.dependencies["gnustep-gui"].package_folder, "share/GNUstep/Makefiles")
-        build_makefiles = os.path.join(self.build_folder, "build/Makefiles")
-        mkdir(self, build_makefiles)
-        shutil.copytree(gnustep_make_makefiles, build_makefiles, dirs_exist_ok=True)
-        shutil.copytree(gnustep_base_makefiles, build_makefiles, dirs_exist_ok=True)
-        shutil.copytree(gnustep_gui_makefiles, build_makefiles, dirs_exist_ok=True)
-
-        if self.settings.os == "Windows":
-            build_makefiles = build_makefiles.replace('\\','/')
-            build_makefiles = build_makefiles.replace('C:','/c')
+        # The GNUstep makefiles are stored in the gnustep-make, gnustep-base and gnustep-gui packages (gnustep-base
+        # and gnustep-gui deploy a single makefile, but that contains additional preprocessor definitions which are
+        # needed).  Merge them into a single folder.
+        self.python_requires["gnustep-helpers"].module.merge_makefiles(self, self.get_dependency_makefiles())
+        build_makefiles = self.get_makefiles_folder()
 
         # Fix header paths
         gnustep_base_include = os.path.join(self.dependencies["gnustep-base"].package_folder, "include/")
@@ -102,6 +103,12 @@ class GnustepHeadlessRecipe(ConanFile):
         # On Windows, use a copy of pkgconf which ships via Conan
         self.python_requires["gnustep-helpers"].module.configure_windows_pkgconf(self, env)
 
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_autotools_compiler_cache(self, tc, env)
+
+        # Build in parallel, honoring tools.build:jobs
+        self.python_requires["gnustep-helpers"].module.configure_parallel_make(self, tc)
+
         tc.generate(env)
 
         deps = PkgConfigDeps(self)
@@ -112,9 +119,28 @@ class GnustepHeadlessRecipe(ConanFile):
 
     def build(self):
         autotools = Autotools(self)
-        autotools.configure()
-        autotools.make()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            autotools.configure()
+        self.python_requires["gnustep-helpers"].module.gnustep_make(self, autotools)
 
     def package(self):
         autotools = Autotools(self)
-        autotools.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            autotools.install()
+
+        # Move any additional makefiles, which make install puts in $DESTDIR/$GNUSTEP_MAKEFILES/Additional/
+        self.python_requires["gnustep-helpers"].module.package_additional_makefiles(self, self.get_makefiles_folder())
+
+        # Extract compiler options, and cache them for use by package_info
+        self.python_requires["gnustep-helpers"].module.package_pc_data(self, "gnustep-back")
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
+
+    def package_info(self):
+        self.python_requires["gnustep-helpers"].module.package_info_pc_data(self)
@@ -0,0 +1,134 @@
+#ifndef GNUSTEP_BENCH_H
+#define GNUSTEP_BENCH_H
+
+#include <stdarg.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <time.h>
+#include <unistd.h>
+#endif
+
+// Shared plumbing for the benchmarks in the test packages of libobjc2, libdispatch and gnustep-base.
+//
+// The benchmarks write their results as a JSON document to stdout, and to the file passed as the first argument
+// (if any); the second argument scales the number of iterations.  The document looks like this:
+//
+// {
+//   (header fields, e.g. "cores": 8,)
+//   "benchmarks": [
+//     {"name": "...", "iterations": ..., "threads": ..., "ns_per_op": ...},
+//     ...
+//   ]
+//   (trailer fields, e.g. , "rss_mb": [...])
+// }
+
+static inline double bench_now_ns(void)
+{
+#ifdef _WIN32
+    LARGE_INTEGER frequency, counter;
+    QueryPerformanceFrequency(&frequency);
+    QueryPerformanceCounter(&counter);
+    return (double)counter.QuadPart * 1e9 / (double)frequency.QuadPart;
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (double)ts.tv_sec * 1e9 + (double)ts.tv_nsec;
+#endif
+}
+
+static inline int bench_cpu_count(void)
+{
+#ifdef _WIN32
+    SYSTEM_INFO info;
+    GetSystemInfo(&info);
+    return (int)info.dwNumberOfProcessors;
+#else
+    long count = sysconf(_SC_NPROCESSORS_ONLN);
+    return count > 0 ? (int)count : 1;
+#endif
+}
+
+static FILE *bench_output_file;
+static int bench_result_count;
+
+// Writes (part of) the JSON document to stdout, and to the output file
+static inline void bench_emit(const char *format, ...)
+{
+    va_list args;
+
+    va_start(args, format);
+    vprintf(format, args);
+    va_end(args);
+
+    if (bench_output_file)
+    {
+        va_start(args, format);
+        vfprintf(bench_output_file, format, args);
+        va_end(args);
+    }
+}
+
+// Opens the output file (if any) and starts the document.  Returns 0 if the output file can't be opened.
+static inline int bench_begin(int argc, char **argv)
+{
+    if (argc > 1)
+    {
+        bench_output_file = fopen(argv[1], "w");
+        if (!bench_output_file)
+        {
+            fprintf(stderr, "Could not open %s\n", argv[1]);
+            return 0;
+        }
+    }
+
+    bench_emit("{");
+    return 1;
+}
+
+// The number of iterations, scaled by the second argument
+static inline long bench_iterations(int argc, char **argv, long iterations)
+{
+    double scale = argc > 2 ? atof(argv[2]) : 1.0;
+    return (long)(iterations * scale);
+}
+
+static inline void bench_begin_results(void)
+{
+    bench_result_count = 0;
+    bench_emit("\n  \"benchmarks\": [");
+}
+
+// Returns the separator which goes before the next result
+static inline const char *bench_separator(void)
+{
+    return bench_result_count++ == 0 ? "" : ",";
+}
+
+static inline void bench_report(const char *name, long iterations, int threads, double elapsed_ns)
+{
+    bench_emit("%s\n    {\"name\": \"%s\", \"iterations\": %ld, \"threads\": %d, \"ns_per_op\": %.3f}",
+        bench_separator(), name, iterations, threads, elapsed_ns / (double)iterations);
+}
+
+static inline void bench_end_results(void)
+{
+    bench_emit("\n  ]");
+}
+
+// Ends the document, and closes the output file
+static inline void bench_end(void)
+{
+    bench_emit("\n}\n");
+
+    if (bench_output_file)
+    {
+        fclose(bench_output_file);
+        bench_output_file = NULL;
+    }
+}
+
+#endif
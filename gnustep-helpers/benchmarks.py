@@ -0,0 +1,51 @@
+import json
+import re
+import statistics
+
+# Helpers for the benchmarks in the test packages.
+#
+# The benchmark programs write their results as JSON:
+# {
+#   "benchmarks": [
+#     {"name": "msg_send_instance", "iterations": 10000000, "threads": 1, "ns_per_op": 2.1},
+#     ...
+#   ]
+# }
+#
+# Results can be compared against a baseline (the results of a previous run), to catch performance regressions.
+
+def load_results(path):
+    with open(path) as stream:
+        data = json.load(stream)
+
+    return {result["name"]: result["ns_per_op"] for result in data["benchmarks"]}
+
+# Compares results against a baseline.  Returns a list of (name, baseline, current, ratio) tuples for all
+# benchmarks in both sets, and the subset of those which are more than tolerance (e.g. 0.1 for 10%) slower.
+def compare_results(results, baseline, tolerance):
+    comparisons = []
+
+    for name, current in results.items():
+        if name not in baseline or baseline[name] <= 0:
+            continue
+
+        comparisons.append((name, baseline[name], current, current / baseline[name]))
+
+    regressions = [x for x in comparisons if x[3] > 1 + tolerance]
+    return comparisons, regressions
+
+# Parses the output of the dynamic loader when LD_DEBUG=statistics is set (glibc), e.g.
+#   12345:	  number of relocations: 1234
+#   12345:	  total startup time in dynamic loader: 456789 cycles
+# Returns a dictionary, e.g. {"number_of_relocations": 1234, "total_startup_time_in_dynamic_loader": 456789}.
+def parse_ld_debug_statistics(output):
+    statistics = {}
+
+    for match in re.finditer(r"^[ \t]*\d+:[ \t]+([a-z ]+):[ \t]+([\d,]+)", output, re.MULTILINE):
+        statistics[match.group(1).strip().replace(" ", "_")] = int(match.group(2).replace(",", ""))
+
+    return statistics
+
+# Returns the median of each metric across a list of samples (dictionaries with the same numeric keys)
+def summarize_samples(samples):
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
@@ -1,15 +1,61 @@
+import benchmarks
+import gnustep_tests
 import package_version
+import sources
 from conan import ConanFile
+from conan.errors import ConanException, ConanInvalidConfiguration
+from conan.tools.build import build_jobs
+from conan.tools.env import Environment, VirtualRunEnv
+from conan.tools.files import check_sha256, copy, get, mkdir, rmdir, save, unzip
+from conan.tools.gnu import PkgConfig
+from conan.tools.scm import Version
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import hashlib
+import json
 import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
 
 def get_package_version(package):
+    # Every recipe calls this when it's loaded, so report the time spent (use -vverbose to see it)
+    start = time.monotonic()
+
     try:
-        return package_version.get_package_version(package)
+        version = package_version.get_package_version(package)
     except Exception as inst:
         # We're building outside of a Git repository.
         # Return None so the package version is set from metadata.
         package.output.warning(f"Couldn't determine version number: {inst}")
-        return None
+        version = None
+
+    package.output.verbose(f"Determined package version {version} in {(time.monotonic() - start) * 1000:.1f}ms")
+    return version
+
+def get_sources(pkg):
+    # Fetches the upstream sources listed in conandata.yml.  If a source store is configured
+    # (-c user.gnustep:source_store=<path>, see sources.py), the sources are extracted from the store when they're
+    # in there, and only downloaded from the upstream URL if they're not.
+    source = sorted(pkg.conan_data["sources"].values())[0]
+
+    store = pkg.conf.get("user.gnustep:source_store", check_type=str)
+    if store and source.get("sha256"):
+        path = sources.get_store_path(store, source["sha256"], source["url"])
+
+        if os.path.exists(path):
+            pkg.output.info(f"Using {source['url']} from the source store ({path})")
+            check_sha256(pkg, path, source["sha256"])
+            unzip(pkg, path, strip_root=source.get("strip_root", False))
+            return
+
+        pkg.output.info(f"{source['url']} is not in the source store, downloading it")
+
+    get(pkg, **source)
 
 def configure_windows_host(pkg, autotools):
     if pkg.settings.os == "Windows":
@@ -39,8 +85,973 @@ def windows_build_requirements(pkg):
             pkg.tool_requires("msys2/cci.latest")
             pkg.tool_requires("pkgconf/[>=2.2]")
 
+def get_compiler_cache(pkg):
+    # The compiler cache (e.g. ccache or sccache) is configured using -c user.gnustep:compiler_cache=ccache.
+    # This is a conf setting, not an option, because it doesn't affect the binaries.
+    return pkg.conf.get("user.gnustep:compiler_cache", check_type=str)
+
+def get_compiler_executable(pkg, language):
+    compiler_executables = pkg.conf.get("tools.build:compiler_executables", default={}, check_type=dict)
+    if compiler_executables.get(language):
+        return compiler_executables[language]
+
+    # The Linux profiles set CC and CXX in [buildenv]
+    compiler = pkg.buildenv.vars(pkg).get("CC" if language == "c" else "CXX")
+    if compiler:
+        return compiler
+
+    if pkg.settings.compiler == "gcc":
+        return "gcc" if language == "c" else "g++"
+    return "clang" if language == "c" else "clang++"
+
+def get_compiler_cache_base_dir(pkg):
+    # Conan package folders contain a hash, so rewrite absolute paths relative to the folder containing both the
+    # build folder and all dependencies (the Conan cache).  This keeps cache hits when the same sources are built
+    # in another folder.  When the build folder is outside the Conan cache (e.g. conan build in a checkout), that
+    # would be the root of the file system, which makes every path relative; use the parent of the build folder
+    # instead.
+    folders = [pkg.build_folder] + [dep.package_folder for dep in pkg.dependencies.values() if dep.package_folder]
+
+    try:
+        base_dir = os.path.commonpath(folders)
+    except ValueError:
+        # On Windows, the folders can be on different drives, which have no common path
+        pkg.output.warning("The build folder and the dependencies are on different drives, not rewriting paths for the compiler cache")
+        return None
+
+    if os.path.dirname(base_dir) == base_dir:
+        base_dir = os.path.dirname(pkg.build_folder)
+
+    return base_dir
+
+def configure_compiler_cache_environment(pkg, launcher, env):
+    base_dir = get_compiler_cache_base_dir(pkg)
+    if not base_dir:
+        return
+
+    if os.path.basename(launcher).startswith("sccache"):
+        env.define("SCCACHE_BASEDIRS", base_dir)
+    else:
+        env.define("CCACHE_BASEDIR", base_dir)
+        env.define("CCACHE_NOHASHDIR", "true")
+
+def configure_autotools_compiler_cache(pkg, tc, env):
+    launcher = get_compiler_cache(pkg)
+    if not launcher:
+        return
+
+    cc = f"{launcher} {get_compiler_executable(pkg, 'c')}"
+    cxx = f"{launcher} {get_compiler_executable(pkg, 'cpp')}"
+
+    # The configure scripts pick up the compilers from the environment, but gnustep-make stores the compiler
+    # in its config.make, which takes precedence over the environment, so pass them to make, too.
+    for variable, value in [("CC", cc), ("OBJC", cc), ("CXX", cxx), ("OBJCXX", cxx)]:
+        env.define(variable, value)
+        tc.make_args.append(f"{variable}='{value}'")
+
+    configure_compiler_cache_environment(pkg, launcher, env)
+
+def configure_cmake_compiler_cache(pkg, tc):
+    launcher = get_compiler_cache(pkg)
+    if not launcher:
+        return
+
+    for language in ["C", "CXX", "OBJC", "OBJCXX"]:
+        tc.cache_variables[f"CMAKE_{language}_COMPILER_LAUNCHER"] = launcher
+
+    env = Environment()
+    configure_compiler_cache_environment(pkg, launcher, env)
+    env.vars(pkg).save_script("conan_compiler_cache")
+
+def configure_parallel_make(pkg, tc):
+    # gnustep-make builds the instances of a project (e.g. a library and its bundles) in parallel, and forwards -j
+    # to the sub-makes for subprojects through the jobserver.  Be explicit about that, so the build doesn't depend on
+    # how gnustep-make was configured.  Autotools.make() (which also runs make check and make install) already
+    # passes -j, based on tools.build:jobs.
+    tc.make_args.append("GNUSTEP_MAKE_PARALLEL_BUILDING=yes")
+
+    if pkg.conf.get("tools.build:verbosity", check_type=str) == "verbose":
+        tc.make_args.append("messages=yes")
+
+# The report of the time and memory spent in each phase of the build, in the metadata folder
+BUILD_PHASES_FILE = "build-phases.json"
+
+def get_resource_usage():
+    # Returns the CPU time (in seconds) and peak resident set size (in bytes) of this process and all its finished
+    # child processes.  The resource module is not available on Windows, where only the CPU time of this process
+    # is known.
+    try:
+        import resource
+    except ImportError:
+        return time.process_time(), None
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+    # ru_maxrss is in bytes on macOS, but in kilobytes everywhere else
+    scale = 1 if sys.platform == "darwin" else 1024
+    return cpu_seconds, max(own.ru_maxrss, children.ru_maxrss) * scale
+
+def get_build_phases_path(pkg, phase):
+    # source() runs once per recipe revision, so the phases of source() are stored with the recipe.  Returns None
+    # when there's no metadata folder, e.g. for generate() in a local conan install.
+    folder = pkg.recipe_metadata_folder if phase == "source" else pkg.package_metadata_folder
+    return os.path.join(folder, BUILD_PHASES_FILE) if folder else None
+
+def load_build_phases(path):
+    if not path:
+        return {}
+
+    try:
+        with open(path) as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return {}
+
+def record_build_phase(pkg, phase, wall_seconds, cpu_seconds, peak_rss):
+    # Keep a report of the time spent in each phase in the metadata folder, so the effect of build settings
+    # can be compared across builds.  A phase which runs again (e.g. in a conan build loop) replaces the
+    # previous measurement.
+    report_path = get_build_phases_path(pkg, phase)
+    if report_path:
+        report = load_build_phases(report_path)
+
+        report[phase] = {
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+            "jobs": build_jobs(pkg),
+        }
+
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as stream:
+            json.dump(report, stream, indent=2)
+
+    pkg.output.info(f"{phase} took {wall_seconds:.1f}s ({cpu_seconds:.1f}s CPU, {build_jobs(pkg)} jobs)")
+
+@contextmanager
+def build_phase(pkg, phase):
+    # Measures the wall time, CPU time (including child processes, such as the compiler) and peak memory use of a
+    # phase of the build.  The peak RSS is a high-water mark of the largest process so far, so it's an upper
+    # bound for phases which don't exceed the peak of an earlier phase.
+    start = time.monotonic()
+    start_cpu_seconds, _ = get_resource_usage()
+
+    try:
+        yield
+    finally:
+        cpu_seconds, peak_rss = get_resource_usage()
+        record_build_phase(pkg, phase, time.monotonic() - start, cpu_seconds - start_cpu_seconds, peak_rss)
+
+def summarize_build_phases(pkg):
+    # Prints the time spent in each phase of the build; call this at the end of package()
+    phases = {**load_build_phases(get_build_phases_path(pkg, "source")), **load_build_phases(get_build_phases_path(pkg, "package"))}
+    if not phases:
+        return
+
+    pkg.output.info("Build phases (wall time, CPU time, peak RSS):")
+    for phase, data in phases.items():
+        peak_rss = f"{data['peak_rss_mb']:.0f} MB" if data["peak_rss_mb"] is not None else "n/a"
+        pkg.output.info(f"  {phase:<24} {data['wall_seconds']:9.1f}s {data['cpu_seconds']:9.1f}s {peak_rss:>10}")
+
+    total = sum(data["wall_seconds"] for data in phases.values())
+    pkg.output.info(f"  {'total':<24} {total:9.1f}s")
+
+def gnustep_make(pkg, autotools, target=None, args=None):
+    with build_phase(pkg, f"make {target or 'all'}"):
+        autotools.make(target=target, args=args)
+
+# Records which packages were merged into a folder by merge_makefiles
+MERGED_MAKEFILES_MARKER = ".conan-merged-makefiles.json"
+
+# Merged folders in the shared cache which weren't used for this many days are removed
+MAKEFILES_CACHE_MAX_AGE_DAYS = 30
+
+def merge_makefiles(pkg, dependencies):
+    # The GNUstep makefiles are stored in the gnustep-make package, and libraries such as gnustep-base and gnustep-gui
+    # add Additional makefiles (which contain preprocessor definitions that are needed) in their own package.  The
+    # GNUstep filesystem doesn't deal with this layout very well, so create a single folder into which the makefiles
+    # of the dependencies are merged (in order), and return its path.
+    #
+    # Package revisions are immutable, so the merged folder is shared by all builds with the same dependency
+    # package references (see get_merged_makefiles_folder), and never changes once it exists.  This saves a lot of
+    # file I/O in conan build loops and across recipes, especially on Windows.  Dependencies without a package
+    # revision (editable packages) may change at any time, so then the makefiles are merged into the build folder,
+    # every time.  The files are copied, so editing the merged folder never changes a package (or vice versa).
+    merged_folder = get_merged_makefiles_folder(pkg, dependencies)
+    marker_path = os.path.join(merged_folder, MERGED_MAKEFILES_MARKER)
+    key = get_makefiles_key(dependencies)
+
+    if key and os.path.exists(marker_path):
+        # Record the use, so prune_makefiles_cache keeps the folder
+        os.utime(marker_path)
+        return merged_folder
+
+    with build_phase(pkg, "merge makefiles"):
+        # Merge into a temporary folder, and move it into place when it's complete, so concurrent builds never see
+        # a partially merged folder
+        os.makedirs(os.path.dirname(merged_folder), exist_ok=True)
+        temp_folder = tempfile.mkdtemp(dir=os.path.dirname(merged_folder))
+
+        try:
+            for dependency in dependencies:
+                shutil.copytree(os.path.join(dependency.package_folder, "share", "GNUstep", "Makefiles"), temp_folder, dirs_exist_ok=True)
+
+            with open(os.path.join(temp_folder, MERGED_MAKEFILES_MARKER), "w") as stream:
+                json.dump(key or [str(dependency.ref) for dependency in dependencies], stream, indent=2)
+
+            if not key and os.path.exists(merged_folder):
+                shutil.rmtree(merged_folder)
+
+            try:
+                os.rename(temp_folder, merged_folder)
+            except OSError:
+                # Another build merged the same packages in the meantime
+                if not os.path.exists(marker_path):
+                    raise
+        finally:
+            if os.path.exists(temp_folder):
+                shutil.rmtree(temp_folder)
+
+        if key:
+            prune_makefiles_cache(os.path.dirname(merged_folder))
+
+    return merged_folder
+
+def get_makefiles_key(dependencies):
+    # The full package references (including the package ids and revisions) of the dependencies, or None if one of
+    # them has no package revision
+    if any(dependency.pref.revision is None for dependency in dependencies):
+        return None
+    return [dependency.pref.repr_notime() for dependency in dependencies]
+
+def get_makefiles_cache_folder(pkg):
+    # The merged folders are stored in user.gnustep:makefiles_cache (default: gnustep-makefiles in the Conan home).
+    # The folder can be removed at any time; it's filled again by the next build.
+    cache_folder = pkg.conf.get("user.gnustep:makefiles_cache", check_type=str)
+    if not cache_folder:
+        conan_home = os.environ.get("CONAN_HOME") or os.path.join(os.path.expanduser("~"), ".conan2")
+        cache_folder = os.path.join(conan_home, "gnustep-makefiles")
+    return os.path.expanduser(cache_folder)
+
+def get_merged_makefiles_folder(pkg, dependencies):
+    key = get_makefiles_key(dependencies)
+    if not key:
+        return os.path.join(pkg.build_folder, "build", "Makefiles")
+
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:16]
+    return os.path.join(get_makefiles_cache_folder(pkg), digest)
+
+def prune_makefiles_cache(cache_folder):
+    # Removes the merged folders which weren't used for MAKEFILES_CACHE_MAX_AGE_DAYS
+    deadline = time.time() - MAKEFILES_CACHE_MAX_AGE_DAYS * 24 * 3600
+
+    for name in os.listdir(cache_folder):
+        marker_path = os.path.join(cache_folder, name, MERGED_MAKEFILES_MARKER)
+        try:
+            if os.path.getmtime(marker_path) < deadline:
+                shutil.rmtree(os.path.join(cache_folder, name), ignore_errors=True)
+        except OSError:
+            # Not a merged folder, or it was removed in the meantime
+            pass
+
+def package_additional_makefiles(pkg, makefiles_folder):
+    # make install copies the additional makefiles (e.g. base.make) into $DESTDIR/$GNUSTEP_MAKEFILES/Additional/, but
+    # GNUSTEP_MAKEFILES is a fully qualified path (/home/user/.conan2/p/b/{package}/...).  gnustep-make uses the same
+    # variable to locate its own makefiles, so this can't be avoided at install time; move the makefiles to
+    # share/GNUstep/Makefiles/Additional/ and remove the misplaced tree instead.
+    #
+    # makefiles_folder is the value of GNUSTEP_MAKEFILES which was passed to make.  This always runs in a GNU-like
+    # context (Linux or MSYS), so it's a Unix path (/c/Users/... on Windows).
+    with build_phase(pkg, "package fixups"):
+        relative_folder = makefiles_folder.strip("/")
+
+        src = os.path.join(pkg.package_folder, relative_folder, "Additional")
+        if os.path.isdir(src):
+            copy(pkg, "*.make", src=src, dst=os.path.join(pkg.package_folder, "share/GNUstep/Makefiles/Additional/"))
+
+        # The misplaced tree starts at the root of the file system, e.g. home/ or c/; don't remove any of the
+        # regular package folders if the Conan cache happens to live in a folder with the same name
+        top_folder = relative_folder.split("/")[0]
+        if top_folder not in ["bin", "include", "lib", "res", "share"]:
+            rmdir(pkg, os.path.join(pkg.package_folder, top_folder))
+
+def run_gnustep_tests(pkg, tests_folder, suite, env, directories=None):
+    # Runs the test suite (e.g. Tests/base) using gnustep-tests, with the test directories distributed across
+    # tools.build:jobs shards which run in parallel.  env contains the environment variables the tests need (which
+    # a make check target would usually set).  The results of all shards are merged into tests.sum and tests.log
+    # in the build folder.
+    with build_phase(pkg, f"gnustep-tests {suite}"):
+        test_directories = gnustep_tests.find_test_directories(os.path.join(tests_folder, suite))
+        if directories is not None:
+            missing = [name for name in directories if name not in test_directories]
+            if missing:
+                pkg.output.warning(f"The test directories {', '.join(missing)} don't exist in {suite}, skipping them")
+            test_directories = {name: count for name, count in test_directories.items() if name in directories}
+
+        # An empty set of shards would only fail later (in ThreadPoolExecutor), without saying why
+        if not test_directories:
+            if directories is not None:
+                raise ConanException(f"None of the test directories {', '.join(directories)} exist in {os.path.join(tests_folder, suite)}")
+            raise ConanException(f"There are no tests in {os.path.join(tests_folder, suite)}")
+
+        shards = gnustep_tests.assign_shards(test_directories, build_jobs(pkg) or 1)
+        shards_folder = os.path.join(pkg.build_folder, "Tests-shards")
+
+        env.vars(pkg, scope="gnustep_tests").save_script("conan_gnustep_tests")
+
+        pkg.output.info(f"Running {sum(test_directories.values())} test files in {len(shards)} shards")
+
+        def run_shard(index):
+            shard_folder = os.path.join(shards_folder, f"shard-{index}")
+            gnustep_tests.prepare_shard(tests_folder, suite, shards[index], shard_folder)
+
+            test_paths = " ".join(f"'{suite}/{name}'" for name in shards[index])
+            with open(os.path.join(shard_folder, "gnustep-tests.out"), "w") as stdout:
+                return pkg.run(
+                    f"gnustep-tests {test_paths}",
+                    cwd=shard_folder,
+                    env=["conanbuild", "conan_gnustep_tests"],
+                    stdout=stdout,
+                    stderr=stdout,
+                    ignore_errors=True)
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            exit_codes = list(executor.map(run_shard, range(len(shards))))
+
+        shard_folders = [os.path.join(shards_folder, f"shard-{index}") for index in range(len(shards))]
+        summary_path = os.path.join(pkg.build_folder, "tests.sum")
+        counts = gnustep_tests.merge_summaries([os.path.join(f, "tests.sum") for f in shard_folders], summary_path)
+        gnustep_tests.merge_logs([os.path.join(f, "tests.log") for f in shard_folders], os.path.join(pkg.build_folder, "tests.log"))
+
+        for category, count in counts.items():
+            if count > 0:
+                pkg.output.info(f"{count:7d} {category}{'' if count == 1 else 's'}")
+
+    failed_shards = [index for index, exit_code in enumerate(exit_codes) if exit_code != 0]
+    if failed_shards:
+        raise ConanException(f"Tests failed in shards {failed_shards}, see {summary_path} for details")
+
+def validate_lto(pkg):
+    # Link-time optimization is configured using the lto option (off, thin or full), and relies on clang and lld
+    if pkg.options.get_safe("lto", "off") != "off" and pkg.settings.compiler != "clang":
+        raise ConanInvalidConfiguration(f"Link-time optimization requires clang.  You are currently using {pkg.settings.compiler}")
+
+def get_lto_flags(pkg):
+    # Returns the compiler and linker flags for link-time optimization
+    lto = pkg.options.get_safe("lto", "off")
+    if lto == "off":
+        return [], []
+
+    return [f"-flto={lto}"], [f"-flto={lto}", "-fuse-ld=lld"]
+
+def configure_cmake_lto(pkg, tc):
+    compile_flags, link_flags = get_lto_flags(pkg)
+    if not compile_flags:
+        return
+
+    tc.extra_cflags.extend(compile_flags)
+    tc.extra_cxxflags.extend(compile_flags)
+    tc.extra_sharedlinkflags.extend(link_flags)
+    tc.extra_exelinkflags.extend(link_flags)
+
+    # Static libraries contain LLVM bitcode, which only the LLVM tools can index
+    if not pkg.options.get_safe("shared"):
+        tc.cache_variables["CMAKE_AR"] = "llvm-ar"
+        tc.cache_variables["CMAKE_RANLIB"] = "llvm-ranlib"
+
+def configure_autotools_lto(pkg, tc, env):
+    compile_flags, link_flags = get_lto_flags(pkg)
+    if not compile_flags:
+        return
+
+    # The recipes have already computed the environment of the toolchain, so append to that environment
+    for variable in ["CFLAGS", "CXXFLAGS", "OBJCFLAGS"]:
+        env.append(variable, " ".join(compile_flags))
+    env.append("LDFLAGS", " ".join(link_flags))
+
+    # Static libraries contain LLVM bitcode, which only the LLVM tools can index.  gnustep-make stores the tools in
+    # its config.make, which takes precedence over the environment, so pass them to make, too.
+    if not pkg.options.get_safe("shared"):
+        for variable, value in [("AR", "llvm-ar"), ("RANLIB", "llvm-ranlib")]:
+            env.define(variable, value)
+            tc.make_args.append(f"{variable}={value}")
+
+def package_info_lto(pkg):
+    # Static libraries built with LTO contain LLVM bitcode, so consumers need to link them with LTO, too
+    _, link_flags = get_lto_flags(pkg)
+    if link_flags and not pkg.options.get_safe("shared"):
+        pkg.cpp_info.sharedlinkflags.extend(link_flags)
+        pkg.cpp_info.exelinkflags.extend(link_flags)
+
+def get_function_sections_flags(pkg):
+    # Places each function and data item in its own section, so consumers which link statically can drop unused
+    # code using -Wl,--gc-sections
+    if not pkg.options.get_safe("function_sections"):
+        return []
+
+    return ["-ffunction-sections", "-fdata-sections"]
+
+def configure_cmake_function_sections(pkg, tc):
+    flags = get_function_sections_flags(pkg)
+    tc.extra_cflags.extend(flags)
+    tc.extra_cxxflags.extend(flags)
+
+def configure_autotools_function_sections(pkg, env):
+    flags = get_function_sections_flags(pkg)
+    if not flags:
+        return
+
+    # The recipes have already computed the environment of the toolchain, so append to that environment
+    for variable in ["CFLAGS", "CXXFLAGS", "OBJCFLAGS"]:
+        env.append(variable, " ".join(flags))
+
+def configure_static_runtime(pkg):
+    # The static_runtime option (on gnustep-base) links libobjc2, libdispatch and gnustep-base statically into the
+    # consumer, which avoids the cost of loading and relocating the shared libraries when a process starts.  All
+    # three are built with function sections, so the consumer can link with -Wl,--gc-sections.
+    if not pkg.options.get_safe("static_runtime"):
+        return
+
+    pkg.options.shared = False
+    pkg.options.function_sections = True
+
+    for name in ["libobjc2", "libdispatch"]:
+        pkg.options[name].shared = False
+        pkg.options[name].function_sections = True
+
+def validate_static_runtime(pkg):
+    if not pkg.options.get_safe("static_runtime"):
+        return
+
+    if pkg.options.get_safe("objc_runtime") != "ng":
+        raise ConanInvalidConfiguration("The static runtime requires objc_runtime=ng")
+
+    # The Objective-C libraries are linked using --whole-archive, which the linkers on Windows and macOS don't support
+    if pkg.settings.os in ["Windows", "Macos"]:
+        raise ConanInvalidConfiguration(f"The static runtime is not supported on {pkg.settings.os}")
+
+# The allocators which can be selected using the allocator option, and the packages which provide them
+ALLOCATORS = {
+    "jemalloc": "jemalloc/5.3.0",
+    "mimalloc": "mimalloc/2.1.7",
+}
+
+def configure_allocator(pkg):
+    # gnustep-base passes its allocator on to libobjc2, so the whole runtime uses the same allocator
+    if pkg.options.get_safe("objc_runtime") == "ng":
+        pkg.options["libobjc2"].allocator = str(pkg.options.allocator)
+
+    # mimalloc only replaces malloc and free when it's built with override.  A static mimalloc is built as a single
+    # object file, so the linker can't leave out the definitions of malloc and free (and keep the ones of the C library).
+    if pkg.options.get_safe("allocator") == "mimalloc":
+        pkg.options["mimalloc"].override = True
+        pkg.options["mimalloc"].single_object = True
+
+def validate_allocator(pkg):
+    # The allocator replaces malloc by preceding the C library in the symbol lookup order, which relies on ELF
+    # symbol interposition
+    if pkg.options.get_safe("allocator", "system") != "system" and pkg.settings.os not in ["Linux", "FreeBSD"]:
+        raise ConanInvalidConfiguration(f"The {pkg.options.allocator} allocator is not supported on {pkg.settings.os}")
+
+def requires_allocator(pkg):
+    allocator = pkg.options.get_safe("allocator", "system")
+    if allocator != "system":
+        # Consumers link the allocator directly, so it replaces malloc for the entire process
+        pkg.requires(ALLOCATORS[allocator], transitive_libs=True)
+
+def get_allocator_link_flags(pkg):
+    # Returns the flags which link a shared allocator.  A static allocator is linked into the executable along with
+    # the static libraries which use it, which is sufficient for it to replace malloc.
+    allocator = pkg.options.get_safe("allocator", "system")
+    if allocator == "system" or not pkg.dependencies[allocator].options.get_safe("shared"):
+        return []
+
+    # The shared library of the allocator has to be loaded before the C library, which means it has to be a direct
+    # dependency of the executable, even if the executable itself doesn't call malloc (so --as-needed would drop it)
+    cpp_info = pkg.dependencies[allocator].cpp_info.aggregated_components()
+    return [
+        "-Wl,--push-state,--no-as-needed",
+        *[f"-L{libdir}" for libdir in cpp_info.libdirs],
+        *[f"-l{lib}" for lib in cpp_info.libs],
+        "-Wl,--pop-state",
+    ]
+
+def configure_cmake_allocator(pkg, tc):
+    link_flags = get_allocator_link_flags(pkg)
+    tc.extra_sharedlinkflags.extend(link_flags)
+    tc.extra_exelinkflags.extend(link_flags)
+
+def package_info_allocator(pkg):
+    pkg.cpp_info.exelinkflags.extend(get_allocator_link_flags(pkg))
+
+def package_info_whole_archive(pkg, lib):
+    # Objective-C classes and categories are registered by load functions in the object files which define them, and
+    # nothing references those object files by symbol, so the linker would drop them from a static library.  With the
+    # static runtime, the Objective-C libraries (gnustep-base and libobjc2) are linked into executables using
+    # --whole-archive instead.
+    if not pkg.options.get_safe("static_runtime"):
+        return
+
+    archives = [os.path.join(pkg.package_folder, "lib", f"lib{lib}.a")]
+
+    # libobjc2 doesn't know it's part of the static runtime, so its archive is linked from here as well.  The regular
+    # -lobjc which follows later on the command line then no longer adds anything.
+    if "libobjc2" in pkg.dependencies:
+        archives.append(os.path.join(pkg.dependencies["libobjc2"].package_folder, "lib", "libobjc.a"))
+
+    pkg.cpp_info.libs.remove(lib)
+
+    # CMake de-duplicates link options, which would merge the -Wl,--whole-archive flags of several archives, so each
+    # archive is passed as a single option.  Shared libraries (e.g. bundles or frameworks) link the archives, too.
+    for archive in archives:
+        link_flag = f"-Wl,--whole-archive,{archive},--no-whole-archive"
+        pkg.cpp_info.sharedlinkflags.append(link_flag)
+        pkg.cpp_info.exelinkflags.append(link_flag)
+
+def validate_pgo(pkg):
+    # Profile-guided optimization is configured using the pgo option (off, generate or use), and relies on clang
+    if pkg.options.get_safe("pgo", "off") != "off" and pkg.settings.compiler != "clang":
+        raise ConanInvalidConfiguration(f"Profile-guided optimization requires clang.  You are currently using {pkg.settings.compiler}")
+
+# The package which contains the profile data for pgo=use (see gnustep-pgo-profile/conanfile.py)
+PGO_PROFILE_PACKAGE = "gnustep-pgo-profile"
+
+def requires_pgo_profile(pkg):
+    # Binaries built with pgo=use depend on the contents of the profile, not just on the option.  The profile is a
+    # versioned package which changes its recipe revision with the profile, so requiring it in full_mode makes its
+    # reference part of the package id: consumers which resolve the same profile resolve the same binary.  The
+    # latest profile is used, unless a version is configured using -c user.gnustep:pgo_profile_version=...
+    if pkg.options.get_safe("pgo", "off") == "use":
+        version = pkg.conf.get("user.gnustep:pgo_profile_version", default="[*]", check_type=str)
+        pkg.requires(f"{PGO_PROFILE_PACKAGE}/{version}", headers=False, libs=False, run=False, visible=False, package_id_mode="full_mode")
+
+def get_pgo_profile(pkg):
+    # The merged profile data (.profdata) which is used when pgo=use
+    return os.path.join(pkg.dependencies[PGO_PROFILE_PACKAGE].package_folder, "res", "pgo", "gnustep.profdata")
+
+def get_pgo_flags(pkg):
+    # Returns the compiler and linker flags for profile-guided optimization
+    pgo = pkg.options.get_safe("pgo", "off")
+    if pgo == "generate":
+        return ["-fprofile-generate"], ["-fprofile-generate"]
+    elif pgo == "use":
+        profile = get_pgo_profile(pkg).replace('\\', '/')
+        return [f"-fprofile-use={profile}", "-Wno-profile-instr-unprofiled"], []
+
+    return [], []
+
+def configure_cmake_pgo(pkg, tc):
+    compile_flags, link_flags = get_pgo_flags(pkg)
+
+    tc.extra_cflags.extend(compile_flags)
+    tc.extra_cxxflags.extend(compile_flags)
+    tc.extra_sharedlinkflags.extend(link_flags)
+    tc.extra_exelinkflags.extend(link_flags)
+
+def configure_autotools_pgo(pkg, env):
+    compile_flags, link_flags = get_pgo_flags(pkg)
+
+    # The recipes have already computed the environment of the toolchain, so append to that environment
+    if compile_flags:
+        for variable in ["CFLAGS", "CXXFLAGS", "OBJCFLAGS"]:
+            env.append(variable, " ".join(compile_flags))
+    if link_flags:
+        env.append("LDFLAGS", " ".join(link_flags))
+
+def package_info_pgo(pkg):
+    # Instrumented static libraries need the profile runtime, which clang links when -fprofile-generate is passed
+    if pkg.options.get_safe("pgo", "off") == "generate" and not pkg.options.get_safe("shared"):
+        pkg.cpp_info.sharedlinkflags.append("-fprofile-generate")
+        pkg.cpp_info.exelinkflags.append("-fprofile-generate")
+
+def validate_split_debug_info(pkg):
+    # The debug info is split off using objcopy and looked up by build id, which is specific to ELF binaries
+    if pkg.options.get_safe("split_debug_info") and pkg.settings.os not in ["Linux", "FreeBSD"]:
+        raise ConanInvalidConfiguration(f"Split debug info is only supported on Linux and FreeBSD.  You are currently using {pkg.settings.os}")
+
+def get_split_debug_info_flags(pkg):
+    # Returns the compiler and linker flags to build with compressed debug info and a build id (also in Release
+    # builds); package_split_debug_info moves the debug info out of the binaries once they're installed
+    if not pkg.options.get_safe("split_debug_info"):
+        return [], []
+
+    return ["-g", "-gz=zlib"], ["-Wl,--build-id", "-Wl,--compress-debug-sections=zlib"]
+
+def configure_cmake_split_debug_info(pkg, tc):
+    compile_flags, link_flags = get_split_debug_info_flags(pkg)
+    tc.extra_cflags.extend(compile_flags)
+    tc.extra_cxxflags.extend(compile_flags)
+    tc.extra_sharedlinkflags.extend(link_flags)
+    tc.extra_exelinkflags.extend(link_flags)
+
+def configure_autotools_split_debug_info(pkg, env):
+    compile_flags, link_flags = get_split_debug_info_flags(pkg)
+    if not compile_flags:
+        return
+
+    # The recipes have already computed the environment of the toolchain, so append to that environment
+    for variable in ["CFLAGS", "CXXFLAGS", "OBJCFLAGS"]:
+        env.append(variable, " ".join(compile_flags))
+    env.append("LDFLAGS", " ".join(link_flags))
+
+def get_binutils_executable(pkg, tool):
+    # Use the LLVM binutils with clang, unless configured otherwise (e.g. -c user.gnustep:objcopy=objcopy)
+    executable = pkg.conf.get(f"user.gnustep:{tool}", check_type=str)
+    if executable:
+        return executable
+
+    return f"llvm-{tool}" if pkg.settings.compiler == "clang" else tool
+
+def get_build_id(pkg, path):
+    output = subprocess.run([get_binutils_executable(pkg, "readelf"), "-n", path], check=True, capture_output=True, text=True).stdout
+    match = re.search(r"Build ID:\s*([0-9a-fA-F]+)", output)
+    return match.group(1).lower() if match else None
+
+def package_split_debug_info(pkg):
+    # Moves the debug info of the shared libraries and executables in the package to the metadata folder, using the
+    # .build-id/xx/yyyy.debug layout which gdb and perf understand.  The binaries which are shipped are stripped.
+    # Metadata is only uploaded and downloaded when asked for (conan upload/download --metadata="debug/*"), so
+    # consumers only fetch the debug info when they need it.
+    if not pkg.options.get_safe("split_debug_info"):
+        return
+
+    with build_phase(pkg, "debug info"):
+        objcopy = get_binutils_executable(pkg, "objcopy")
+        debug_folder = os.path.join(pkg.package_metadata_folder, "debug")
+        build_ids = {}
+
+        for folder in ["bin", "lib"]:
+            for root, _, files in os.walk(os.path.join(pkg.package_folder, folder)):
+                for file in files:
+                    path = os.path.join(root, file)
+                    if os.path.islink(path):
+                        continue
+
+                    # Static libraries (which start with !<arch>) keep their debug info
+                    with open(path, "rb") as stream:
+                        if stream.read(4) != b"\x7fELF":
+                            continue
+
+                    build_id = get_build_id(pkg, path)
+                    if not build_id:
+                        pkg.output.warning(f"{path} has no build id, keeping its debug info")
+                        continue
+
+                    debug_path = os.path.join(debug_folder, ".build-id", build_id[:2], f"{build_id[2:]}.debug")
+                    mkdir(pkg, os.path.dirname(debug_path))
+                    pkg.run(f"{objcopy} --only-keep-debug --compress-debug-sections=zlib \"{path}\" \"{debug_path}\"")
+                    pkg.run(f"{objcopy} --strip-debug \"{path}\"")
+
+                    build_ids[os.path.relpath(path, pkg.package_folder).replace("\\", "/")] = build_id
+
+        save(pkg, os.path.join(debug_folder, "build-ids.json"), json.dumps(build_ids, indent=2))
+
+def is_benchmark_enabled(pkg):
+    # Use -c user.gnustep:benchmark=True to run the benchmarks in the test packages
+    return pkg.conf.get("user.gnustep:benchmark", default=False, check_type=bool)
+
+def configure_cmake_benchmark(pkg, tc):
+    # Builds the benchmarks if they're enabled.  The benchmarks share their plumbing (timing and JSON output) through
+    # bench.h, which is exported with gnustep-helpers.
+    tc.cache_variables["GNUSTEP_BENCHMARK"] = is_benchmark_enabled(pkg)
+    tc.cache_variables["GNUSTEP_BENCH_INCLUDE_DIR"] = pkg.python_requires["gnustep-helpers"].path.replace('\\', '/')
+
+def run_benchmark(pkg, bin_path, name="benchmark"):
+    # Runs a benchmark program, which writes its results as JSON to {name}.json in the build folder
+    results_path = os.path.join(pkg.build_folder, f"{name}.json")
+    pkg.run(f"{bin_path} {results_path}", env="conanrun")
+
+    save_benchmark_results(pkg, results_path, name)
+
+def save_benchmark_results(pkg, results_path, name):
+    # Use -c user.gnustep:benchmark_folder=<path> to collect the results of all benchmarks in a folder
+    pkg.output.info(f"Benchmark results written to {results_path}")
+
+    benchmark_folder = pkg.conf.get("user.gnustep:benchmark_folder", check_type=str)
+    if benchmark_folder:
+        os.makedirs(benchmark_folder, exist_ok=True)
+        shutil.copy2(results_path, os.path.join(benchmark_folder, f"{name}.json"))
+
+    # If a baseline is configured (-c user.gnustep:benchmark_baseline=<path to a previous {name}.json, or a folder
+    # which contains it>), the results are compared against it, and benchmarks which are more than
+    # user.gnustep:benchmark_tolerance (default 0.1, so 10%) slower fail the test.
+    baseline_path = pkg.conf.get("user.gnustep:benchmark_baseline", check_type=str)
+    if not baseline_path:
+        return
+
+    if os.path.isdir(baseline_path):
+        baseline_path = os.path.join(baseline_path, f"{name}.json")
+        if not os.path.exists(baseline_path):
+            pkg.output.warning(f"There is no baseline for the {name} benchmark in {os.path.dirname(baseline_path)}")
+            return
+
+    tolerance = pkg.conf.get("user.gnustep:benchmark_tolerance", default=0.1, check_type=float)
+    comparisons, regressions = benchmarks.compare_results(
+        benchmarks.load_results(results_path),
+        benchmarks.load_results(baseline_path),
+        tolerance)
+
+    for benchmark, baseline, current, ratio in comparisons:
+        pkg.output.info(f"{benchmark:40} {baseline:12.3f} ns -> {current:12.3f} ns ({(ratio - 1) * 100:+.1f}%)")
+
+    if regressions:
+        names = ", ".join(x[0] for x in regressions)
+        raise ConanException(f"Performance regressions of more than {tolerance * 100:.0f}% compared to {baseline_path}: {names}")
+
+def evict_from_page_cache(paths):
+    # Drops the pages of the files from the page cache, so the next process which uses them has to read them from
+    # disk.  Unlike writing to /proc/sys/vm/drop_caches, this doesn't require root privileges.
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+def run_startup_benchmark(pkg, bin_path, name="startup", runs=20):
+    # Measures the startup of a minimal Foundation program (startup.m in the gnustep-base test package), which
+    # prints the time since it was launched at a number of points, and the shared objects it loaded.  Warm runs are
+    # run back to back.  On Linux, each cold run is preceded by evicting the program and its shared objects from the
+    # page cache, and the dynamic loader statistics (LD_DEBUG=statistics) are recorded, too.  The results are
+    # written to {name}.json in the build folder, in the same format as the other benchmarks.
+    with VirtualRunEnv(pkg).vars().apply():
+        run_env = dict(os.environ)
+
+    def launch(extra_env=None):
+        env = {**run_env, **(extra_env or {})}
+
+        # The program uses the same monotonic clock (CLOCK_MONOTONIC or QueryPerformanceCounter) as perf_counter
+        env["STARTUP_LAUNCH_NS"] = str(time.perf_counter_ns())
+        result = subprocess.run([bin_path], env=env, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    sample, _ = launch()
+    objects = [bin_path, *sample.pop("objects")]
+    can_evict = pkg.settings.os == "Linux" and hasattr(os, "posix_fadvise")
+
+    cold = []
+    warm = []
+    for _ in range(runs):
+        if can_evict:
+            evict_from_page_cache(objects)
+            sample, _ = launch()
+            sample.pop("objects")
+            cold.append(sample)
+
+        sample, _ = launch()
+        sample.pop("objects")
+        warm.append(sample)
+
+    results = {
+        "configuration": {
+            "shared": str(pkg.dependencies["gnustep-base"].options.shared),
+            "static_runtime": str(pkg.dependencies["gnustep-base"].options.get_safe("static_runtime", False)),
+            "objc_runtime": str(pkg.dependencies["gnustep-base"].options.objc_runtime),
+        },
+        "loaded_objects": len(objects) - 1,
+        "benchmarks": [],
+    }
+
+    for mode, samples in [("cold", cold), ("warm", warm)]:
+        if not samples:
+            continue
+
+        results[mode] = benchmarks.summarize_samples(samples)
+        for metric, value in results[mode].items():
+            results["benchmarks"].append({"name": f"startup_{mode}_{metric}", "iterations": len(samples), "threads": 1, "ns_per_op": value})
+
+    if pkg.settings.os == "Linux":
+        _, output = launch({"LD_DEBUG": "statistics"})
+        results["ld_debug_statistics"] = benchmarks.parse_ld_debug_statistics(output)
+
+    for mode in ["cold", "warm"]:
+        if mode in results:
+            summary = ", ".join(f"{metric} {value / 1e6:.2f} ms" for metric, value in results[mode].items())
+            pkg.output.info(f"{mode} startup: {summary}")
+
+    pkg.output.info(f"{results['loaded_objects']} shared objects loaded")
+
+    results_path = os.path.join(pkg.build_folder, f"{name}.json")
+    with open(results_path, "w") as stream:
+        json.dump(results, stream, indent=2)
+
+    save_benchmark_results(pkg, results_path, name)
+
+def run_ctest(pkg):
+    # Runs the tests using ctest, in parallel (honoring tools.build:jobs), and stores the result and duration of
+    # each test in the package metadata (ctest.json), so slow or flaky tests can be tracked across builds.
+    if pkg.conf.get("tools.build:skip_test", default=False, check_type=bool):
+        return
+
+    junit_path = os.path.join(pkg.build_folder, "ctest-results.xml")
+    jobs = build_jobs(pkg) or 1
+
+    try:
+        with build_phase(pkg, "ctest"):
+            pkg.run(
+                f"ctest --output-on-failure --parallel {jobs} --output-junit \"{junit_path}\" -C {pkg.settings.build_type}",
+                cwd=pkg.build_folder,
+                env=["conanbuild", "conanrun"])
+    finally:
+        if os.path.exists(junit_path):
+            tests = []
+            for testcase in ElementTree.parse(junit_path).getroot().iter("testcase"):
+                if testcase.find("failure") is not None:
+                    status = "failed"
+                elif testcase.find("skipped") is not None or testcase.get("status") == "notrun":
+                    status = "skipped"
+                else:
+                    status = "passed"
+
+                tests.append({"name": testcase.get("name"), "seconds": float(testcase.get("time", 0)), "status": status})
+
+            os.makedirs(pkg.package_metadata_folder, exist_ok=True)
+            with open(os.path.join(pkg.package_metadata_folder, "ctest.json"), "w") as stream:
+                json.dump({"jobs": jobs, "tests": sorted(tests, key=lambda x: -x["seconds"])}, stream, indent=2)
+
+# The compiler flags and preprocessor definitions which are exported to consumers, when they are present in the
+# pkg-config file of a library.  Generic defines, such as NDEBUG or GSWARN and GSDIAGNOSE, are not exported here; the
+# user should be in control of those.
+PC_DATA_CFLAGS = ["-fexceptions", "-fobjc-exceptions", "-fobjc-runtime=", "-fblocks"]
+PC_DATA_DEFINES = ["GNUSTEP_RUNTIME", "_NONFRAGILE_ABI", "GNUSTEP_BASE_LIBRARY", "GNUSTEP_WITH_DLL", "_NATIVE_OBJC_EXCEPTIONS"]
+
+# package_info runs every time a consumer resolves the graph, so keep the flags in a format which doesn't need
+# any third-party parsers, and only read each file once per process
+_pc_data = {}
+
+def get_pc_data_path(pkg):
+    return os.path.join(pkg.package_folder, "res", "pc_data.json")
+
+def package_pc_data(pkg, name):
+    # Extract compiler options from the pkg-config file of a library, and cache them for use by package_info.
+    # Not all libraries ship a pkg-config file; in that case, no flags are exported.
+    pc_data = {
+        "cflags": [],
+        "defines": []
+    }
+
+    pkg_config_folder = os.path.join(pkg.package_folder, "lib", "pkgconfig")
+    if os.path.exists(os.path.join(pkg_config_folder, f"{name}.pc")):
+        pkg_config = PkgConfig(pkg, name, pkg_config_folder.replace('\\','/').replace('C:','/c'))
+
+        for cflag in PC_DATA_CFLAGS:
+            value = next((x for x in pkg_config.cflags if x.startswith(cflag)), None)
+            if value:
+                pc_data["cflags"].append(value)
+
+        for define in PC_DATA_DEFINES:
+            value = next((x for x in pkg_config.defines if x.startswith(define)), None)
+            if value:
+                pc_data["defines"].append(value)
+
+    mkdir(pkg, os.path.dirname(get_pc_data_path(pkg)))
+    save(pkg, get_pc_data_path(pkg), json.dumps(pc_data))
+
+def package_info_pc_data(pkg):
+    path = get_pc_data_path(pkg)
+    if path not in _pc_data:
+        with open(path) as stream:
+            _pc_data[path] = json.load(stream)
+
+    pkg.cpp_info.defines.extend(_pc_data[path]["defines"])
+    pkg.cpp_info.cflags.extend(_pc_data[path]["cflags"])
+
+def validate_modules(pkg):
+    # Clang modules are configured using the modules option, and are specific to clang
+    if pkg.options.get_safe("modules") and pkg.settings.compiler != "clang":
+        raise ConanInvalidConfiguration(f"Clang modules require clang.  You are currently using {pkg.settings.compiler}")
+
+def package_module_map(pkg, module, umbrella_header, requires=None):
+    # Writes a clang module map for a framework-style set of headers (e.g. Foundation/Foundation.h), so consumers
+    # which compile with -fmodules parse the headers once per set of compiler flags (in the module cache), instead
+    # of once per translation unit.  An #import of any header in the module is translated into a module import.
+    if not pkg.options.get_safe("modules"):
+        return
+
+    include_folder = os.path.join(pkg.package_folder, "include")
+    module_map_path = os.path.join(include_folder, module, "module.modulemap")
+    save(pkg, module_map_path,
+        f"module {module} [system] {{\n"
+        f"  umbrella header \"{umbrella_header}\"\n"
+        f"  export *\n"
+        f"  module * {{ export * }}\n"
+        f"}}\n")
+
+    # Make sure the module builds, by importing it using the flags which consumers get from package_info
+    with build_phase(pkg, "module map"):
+        cache_folder = os.path.join(pkg.build_folder, "module-cache")
+        source_path = os.path.join(pkg.build_folder, f"import-{module}.m")
+        save(pkg, source_path, f"@import {module};\n")
+
+        flags = ["-fmodules", f"-fmodules-cache-path={cache_folder}", f"-fmodule-map-file={module_map_path}", f"-I{include_folder}"]
+        for name in requires or []:
+            if name in pkg.dependencies.host:
+                flags.extend(f"-I{folder}" for folder in pkg.dependencies.host[name].cpp_info.includedirs)
+
+        with open(get_pc_data_path(pkg)) as stream:
+            pc_data = json.load(stream)
+        flags.extend(pc_data["cflags"])
+        flags.extend(f"-D{define}" for define in pc_data["defines"])
+
+        compiler = get_compiler_executable(pkg, "c")
+        pkg.run(f"{compiler} -x objective-c -fsyntax-only {' '.join(flags)} {source_path}")
+
+def package_info_module_map(pkg, module):
+    # Consumers import the module by compiling with -fmodules; the module map is passed explicitly, so it doesn't
+    # depend on the order of the include directories
+    if not pkg.options.get_safe("modules"):
+        return
+
+    module_map_path = os.path.join(pkg.package_folder, "include", module, "module.modulemap")
+    pkg.cpp_info.cflags.extend(["-fmodules", f"-fmodule-map-file={module_map_path}"])
+
+def package_id(pkg, cpp=False):
+    # The binary compatibility policy, which is shared by all recipes:
+    # - Packages which only contain C and Objective-C code don't depend on the C++ standard or standard library.
+    #   Pass cpp=True for packages which contain C++ code (e.g. libobjc2).
+    if not cpp:
+        pkg.info.settings.rm_safe("compiler.cppstd")
+        pkg.info.settings.rm_safe("compiler.libcxx")
+
+
+def get_compatible_compiler_versions(pkg):
+    # clang keeps the ABI stable across minor and patch releases, so binaries built with another minor or patch
+    # release of the same major version are compatible (e.g. 18.1.3 and 18.1.8, if the settings list them).  The
+    # full version stays in the package id, so an exact match still wins; the newest release goes first.
+    version = pkg.settings.get_safe("compiler.version")
+    if pkg.settings.get_safe("compiler") != "clang" or not version:
+        return []
+
+    # The possible values are "ANY" if the settings don't restrict the version
+    possible_values = pkg.settings.compiler.version.possible_values()
+    if not isinstance(possible_values, list):
+        return []
+
+    major = Version(str(version)).major
+    candidates = [str(v) for v in possible_values if v is not None and str(v) != str(version) and Version(str(v)).major == major]
+    return sorted(candidates, key=Version, reverse=True)
+
+def compatibility(pkg):
+    # The binaries a consumer can use when there's no binary for its exact configuration, in order of preference:
+    # - binaries built with another minor or patch release of the same clang major version
+    # - for Release consumers, RelWithDebInfo binaries, which are optimized as well (and include debug info)
+    versions = get_compatible_compiler_versions(pkg)
+    build_types = ["RelWithDebInfo"] if pkg.settings.get_safe("build_type") == "Release" else []
+
+    candidates = [{"settings": [("compiler.version", version)]} for version in versions]
+    for build_type in build_types:
+        candidates.append({"settings": [("build_type", build_type)]})
+        candidates.extend({"settings": [("compiler.version", version), ("build_type", build_type)]} for version in versions)
+
+    return candidates or None
+
 class Pkg(ConanFile):
     name = "gnustep-helpers"
     version = "0.1"
     package_type = "python-require"
-    exports = "*.py"
+    exports = "*.py", "bench.h"
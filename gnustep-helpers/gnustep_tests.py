@@ -0,0 +1,106 @@
+import os
+import re
+import shutil
+
+# Helpers for running a GNUstep test suite (gnustep-tests) in shards.
+#
+# gnustep-tests runs the test directories it is given one by one, and writes its results (tests.log and tests.sum)
+# to the current directory.  To run a test suite in parallel, the test directories are distributed across shards;
+# each shard gets a copy of the test folder containing only its own test directories, so the shards don't
+# overwrite each other's results.  Once all shards have completed, their results are merged.
+
+# The categories which gnustep-tests uses in tests.sum, in the order in which they are summarized
+SUMMARY_CATEGORIES = [
+    "Passed test",
+    "Failed test",
+    "Failed build",
+    "Failed file",
+    "Failed set",
+    "Dashed hope",
+    "Skipped set",
+    "Unresolved test",
+]
+
+SUMMARY_LINE = re.compile(r"^(" + "|".join(SUMMARY_CATEGORIES) + r"):")
+
+# Returns the test directories in a suite (e.g. Tests/base), with the number of test files they contain
+def find_test_directories(suite_folder):
+    test_directories = {}
+
+    for name in sorted(os.listdir(suite_folder)):
+        path = os.path.join(suite_folder, name)
+        if not os.path.isdir(path):
+            continue
+
+        count = sum(len([f for f in files if f.endswith(".m")]) for _, _, files in os.walk(path))
+        if count > 0:
+            test_directories[name] = count
+
+    return test_directories
+
+# Distributes the test directories across at most shard_count shards, balancing the number of test files
+# in each shard (largest directories first).
+def assign_shards(test_directories, shard_count):
+    shard_count = max(1, min(shard_count, len(test_directories)))
+    shards = [{"weight": 0, "directories": []} for _ in range(shard_count)]
+
+    for name, weight in sorted(test_directories.items(), key=lambda x: (-x[1], x[0])):
+        shard = min(shards, key=lambda x: x["weight"])
+        shard["weight"] += weight
+        shard["directories"].append(name)
+
+    return [sorted(shard["directories"]) for shard in shards if shard["directories"]]
+
+# Creates a copy of tests_folder in shard_folder, which contains the files in tests_folder and the suite folder,
+# but only the given test directories of the suite.
+def prepare_shard(tests_folder, suite, directories, shard_folder):
+    if os.path.exists(shard_folder):
+        shutil.rmtree(shard_folder)
+
+    suite_folder = os.path.join(tests_folder, suite)
+    shard_suite_folder = os.path.join(shard_folder, suite)
+    os.makedirs(shard_suite_folder)
+
+    for folder, target in [(tests_folder, shard_folder), (suite_folder, shard_suite_folder)]:
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                shutil.copy2(path, target)
+
+    for name in directories:
+        shutil.copytree(os.path.join(suite_folder, name), os.path.join(shard_suite_folder, name))
+
+# Merges the tests.sum files of all shards into a single file, and returns the number of results per category
+def merge_summaries(summary_paths, output_path):
+    lines = []
+    counts = {category: 0 for category in SUMMARY_CATEGORIES}
+
+    for summary_path in summary_paths:
+        if not os.path.exists(summary_path):
+            continue
+
+        with open(summary_path, errors="replace") as stream:
+            for line in stream:
+                match = SUMMARY_LINE.match(line)
+                if match:
+                    lines.append(line.rstrip("\n"))
+                    counts[match.group(1)] += 1
+
+    with open(output_path, "w") as stream:
+        for line in lines:
+            stream.write(f"{line}\n")
+
+        stream.write("\n")
+        for category, count in counts.items():
+            if count > 0:
+                stream.write(f"{count:7d} {category}{'' if count == 1 else 's'}\n")
+
+    return counts
+
+# Concatenates the tests.log files of all shards
+def merge_logs(log_paths, output_path):
+    with open(output_path, "w") as output:
+        for log_path in log_paths:
+            if os.path.exists(log_path):
+                with open(log_path, errors="replace") as stream:
+                    shutil.copyfileobj(stream, output)
@@ -1,4 +1,4 @@
-import yaml
+import json
 import os
 
 # Automatically calculates the package version (x.y.z-{prerelease}+{build}) for the package.
@@ -23,23 +23,234 @@ import os
 # - Runs on a CI server
 # - Supports squash merges
 # - Works for installed packages
+#
+# The history of all packages in the repository is walked at once, and memoized for the lifetime of the process.
+# Whether a package has local changes is only checked for the package whose recipe is loaded.  Walking the history
+# is expensive on repositories with many commits, so the result of each walk is also cached in .git/conan-gnustep/version-cache.json, keyed by the HEAD commit.
+# A later call for a descendant of a cached HEAD only walks the commits which were added since, provided those commits
+# form a linear chain on top of the cached HEAD; when they include a merge, the whole history is walked.
+#
+# Every recipe loads this module (through gnustep-helpers), also when it's installed from the Conan cache or a remote
+# and the version is already known.  pygit2 and yaml are therefore only imported when a version is actually computed.
+
+# The location of the version cache, relative to the .git folder
+VERSION_CACHE_FILE = os.path.join("conan-gnustep", "version-cache.json")
+
+# The number of cached walks which are kept
+VERSION_CACHE_SIZE = 16
+
+# Walks of the history done by this process, by repository folder
+_repository_histories = {}
+
+class VersionCache:
+    def __init__(self, repo_dir):
+        self.path = os.path.join(repo_dir, VERSION_CACHE_FILE)
+
+        try:
+            with open(self.path) as stream:
+                self.entries = json.load(stream)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def candidates(self):
+        # Most recently stored entries first
+        return reversed(list(self.entries.values()))
+
+    def put(self, head, packages):
+        self.entries.pop(head, None)
+        self.entries[head] = {"head": head, "packages": packages}
+
+        while len(self.entries) > VERSION_CACHE_SIZE:
+            del self.entries[next(iter(self.entries))]
+
+    def save(self):
+        # The cache is an optimization only; never fail the build because it can't be written
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as stream:
+                json.dump(self.entries, stream)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+# Determines whether head is reached from cached_head by a linear chain of commits (no merges).  Only then does a
+# topological walk from head list all new commits before all cached commits, which the incremental walk relies on.
+def is_linear_descendant(repo, head, cached_head):
+    commit = repo.get(head)
+
+    while commit.id != cached_head:
+        if len(commit.parent_ids) != 1:
+            return False
+        commit = commit.parents[0]
+
+    return True
+
+def find_cached_ancestor(repo, cache, head):
+    from pygit2 import GitError, Oid
+
+    for entry in cache.candidates():
+        try:
+            cached_head = Oid(hex=entry["head"])
+            if cached_head == head or (repo.descendant_of(head, cached_head) and is_linear_descendant(repo, head, cached_head)):
+                return entry
+        except (GitError, KeyError, ValueError):
+            # The cached commit no longer exists (e.g. after a rebase and gc)
+            continue
+
+    return None
+
+# Returns the upstream version of each package in the repository, as listed in its conandata.yml
+def read_package_versions(repository):
+    import yaml
+
+    versions = {}
+
+    for name in sorted(os.listdir(repository)):
+        conan_path = os.path.join(repository, name, "conandata.yml")
+        if not os.path.isfile(conan_path):
+            continue
+
+        with open(conan_path) as stream:
+            version_data = yaml.safe_load(stream)
+
+        versions[name] = next(iter(version_data["sources"]))
+
+    return versions
 
-def get_package_version(package):    
-    from pygit2 import Repository, BlobIO, Commit, Object
+# Returns the paths of all blobs in tree, recursively
+def list_tree_paths(tree, prefix):
+    from pygit2.enums import ObjectType
+
+    paths = []
+
+    for entry in tree:
+        path = f"{prefix}{entry.name}"
+        if entry.type == ObjectType.TREE:
+            paths.extend(list_tree_paths(entry, f"{path}/"))
+        else:
+            paths.append(path)
+
+    return paths
+
+# Determines whether the package folder has any local modifications (staged, unstaged or untracked files),
+# without scanning the rest of the working tree.  tracked_paths are the paths in the index for this package.
+# repo.status_file compares the stat data (mtime, size) stored in the index first, so only files which were
+# touched after the index was written are hashed.
+def is_package_dirty(repo, head_tree, name, tracked_paths):
+    from pygit2.enums import FileStatus
+
+    prefix = f"{name}/"
+    paths = set(tracked_paths)
+
+    if head_tree.__contains__(name):
+        paths.update(list_tree_paths(head_tree / name, prefix))
+
+    for path in paths:
+        if repo.status_file(path) != FileStatus.CURRENT:
+            return True
+
+    # Look for untracked files, skipping ignored folders (such as build folders of test packages)
+    for root, dirs, files in os.walk(os.path.join(repo.workdir, name)):
+        relative_root = os.path.relpath(root, repo.workdir).replace('\\', '/')
+        dirs[:] = [d for d in dirs if not repo.path_is_ignored(f"{relative_root}/{d}/")]
+
+        for file in files:
+            path = f"{relative_root}/{file}"
+            if path not in paths and not repo.path_is_ignored(path):
+                return True
+
+    return False
+
+# Counts the number of recipes for the current version of each package, in a single walk of the history from head.
+# If base (a cached walk of an ancestor of head) is set, only the commits which are not reachable from the cached
+# head are walked, and the result is combined with the cached result.
+def walk_recipe_history(repo, head, package_versions, base):
+    import yaml
+    from pygit2 import BlobIO, Oid
     from pygit2.enums import SortMode
 
-    repository = os.path.dirname(package.recipe_folder)
-    conan_path = os.path.join(repository, package.name, "conandata.yml")
+    walker = repo.walk(head, SortMode.TOPOLOGICAL)
+    if base:
+        walker.hide(Oid(hex=base["head"]))
 
-    # Use version from metadata if conandata.yml cannot be accessed
-    if not os.path.exists(conan_path):
-        return None
-    
-    with open(conan_path) as stream:
-        version_data = yaml.safe_load(stream)
+    state = {
+        name: {
+            "revision_count": 0,
+            "previous_recipe_tree_id": None,
+            "top_recipe_tree": None,
+            "short_id": None,
+        } for name in package_versions
+    }
+    pending = set(package_versions)
+    commit = None
+
+    for commit in walker:
+        for name in list(pending):
+            if not commit.tree.__contains__(name):
+                continue
+
+            package = state[name]
+            recipe_tree = commit.tree / name
+            commit_package_version = None
+
+            if recipe_tree.__contains__("conandata.yml"):
+                commit_version_data_tree = recipe_tree / "conandata.yml"
+                with BlobIO(commit_version_data_tree) as stream:
+                    commit_version_data = yaml.safe_load(stream)
+                    commit_package_version = next(iter(commit_version_data["sources"]))
+
+            if commit_package_version != package_versions[name]:
+                package["short_id"] = commit.short_id
+                pending.remove(name)
+                continue
+
+            # If there are no changes for this recipe on the main branch
+            if recipe_tree.id != package["previous_recipe_tree_id"]:
+                package["revision_count"] += 1
+                package["previous_recipe_tree_id"] = recipe_tree.id
+
+                if package["top_recipe_tree"] is None:
+                    package["top_recipe_tree"] = str(recipe_tree.id)
+
+        if not pending:
+            break
 
-    package_version = next(iter(version_data["sources"]))
-    revision_count = 0
+    results = {}
+
+    for name, package in state.items():
+        if name in pending and base:
+            # The walk continues into the cached history; don't count the recipe tree at the boundary twice
+            cached = base["packages"][name]
+            revision_count = package["revision_count"] + cached["revision_count"]
+            previous_recipe_tree_id = package["previous_recipe_tree_id"]
+            if previous_recipe_tree_id is not None and str(previous_recipe_tree_id) == cached["top_recipe_tree"]:
+                revision_count -= 1
+
+            results[name] = {
+                "version": package_versions[name],
+                "revision_count": revision_count,
+                "short_id": cached["short_id"],
+                "top_recipe_tree": package["top_recipe_tree"] or cached["top_recipe_tree"],
+            }
+        else:
+            results[name] = {
+                "version": package_versions[name],
+                "revision_count": package["revision_count"],
+                "short_id": package["short_id"] or commit.short_id,
+                "top_recipe_tree": package["top_recipe_tree"],
+            }
+
+    return results
+
+# Walks the history of the repository once, for all packages, and memoizes the result for the lifetime of the process.
+# Returns None if the repository is not a git repository.
+def get_repository_history(repository):
+    from pygit2 import Repository
+
+    repository = os.path.abspath(repository)
+    if repository in _repository_histories:
+        return _repository_histories[repository]
 
     repo_dir = os.path.join(repository, '.git')
 
@@ -47,67 +258,99 @@ def get_package_version(package):
     if not os.path.exists(repo_dir):
         return None
 
+    package_versions = read_package_versions(repository)
+
     repo = Repository(repo_dir)
+    head = repo.head.target
+
+    # Determine the number of recipes we've had for the current version of each package,
+    # reusing a previous walk of the history where possible.  Packages for which the cached
+    # walk was done against a different version are walked from scratch.
+    cache = VersionCache(repo_dir)
+    base = find_cached_ancestor(repo, cache, head)
+
+    based_versions = {}
+    unbased_versions = {}
+    for name, version in package_versions.items():
+        if base and name in base["packages"] and base["packages"][name]["version"] == version:
+            based_versions[name] = version
+        else:
+            unbased_versions[name] = version
+
+    history = {}
+    if based_versions:
+        history.update(walk_recipe_history(repo, head, based_versions, base))
+    if unbased_versions:
+        history.update(walk_recipe_history(repo, head, unbased_versions, None))
+
+    if not base or base["head"] != str(head) or unbased_versions:
+        cache.put(str(head), history)
+        cache.save()
+
+    result = {
+        "repo": repo,
+        "head_tree": repo.get(head).tree,
+        "main_tree": repo.resolve_refish('main')[0].tree,
+        "packages": history,
+    }
+
+    _repository_histories[repository] = result
+    return result
 
-    status = repo.status()
+# Computes the version of a single package, from the history of the repository.  Whether the package has local
+# modifications is not memoized: it's determined for the requested package only, every time its recipe is loaded.
+def compute_package_version(history, name):
+    repo = history["repo"]
+    head_tree = history["head_tree"]
+    main_tree = history["main_tree"]
+    package = history["packages"][name]
+
+    revision_count = package["revision_count"]
 
     # Determine whether there are any local modifications, and increase the revision count
     # if there are
-    is_dirty = len(list(filter(lambda x: x.startswith(package.name), status))) > 0
+    prefix = f"{name}/"
+    tracked_paths = [entry.path for entry in repo.index if entry.path.startswith(prefix)]
+    is_dirty = is_package_dirty(repo, head_tree, name, tracked_paths)
 
     if is_dirty:
-        revision_count = 1
+        revision_count += 1
 
     # Determine whether the tree for the current package was changed between the current branch
     # and the main branch.
-    head_tree = repo.get(repo.head.target).tree
-    if head_tree.__contains__(package.name):
-        head_package_tree = head_tree / package.name
-    else:
-        head_package_tree = None
-
-    main_tree = repo.resolve_refish('main')[0].tree
-    if main_tree.__contains__(package.name):
-        main_package_tree = main_tree / package.name
-    else:
-        main_package_tree = None
+    head_package_tree = head_tree / name if head_tree.__contains__(name) else None
+    main_package_tree = main_tree / name if main_tree.__contains__(name) else None
 
     is_prerelease = head_package_tree != main_package_tree
 
-    # Determine the number of recipes we've had for the current version of the package
-    previous_recipe_tree_id = None
+    recipe_version = package["version"]
 
-    for commit in repo.walk(repo.head.target, SortMode.TOPOLOGICAL):
-        if len(commit.parents) > 0:
-            parent_commit = commit.parents[0]
-        else:
-            parent_commit = None
+    # If we're not building off main, or there any local changes, then consider this a prerelease version
+    if is_prerelease or is_dirty:
+        recipe_version = f"{recipe_version}-g{package['short_id']}"
 
-        if commit.tree.__contains__(package.name):
-            recipe_tree = commit.tree / package.name
-            commit_package_version = None
+    # Add the revision count as a build version, this will force Conan to pick up newer builds
+    return f"{recipe_version}+{revision_count}"
 
-            if recipe_tree.__contains__("conandata.yml"):
-                commit_version_data_tree = recipe_tree / "conandata.yml"
-                with BlobIO(commit_version_data_tree) as stream:
-                    commit_version_data = yaml.safe_load(stream)
-                    commit_package_version = next(iter(commit_version_data["sources"]))
+# Returns True if the recipe was loaded from the Conan cache (e.g. installed from a remote), in which case the
+# version is part of the exported metadata
+def is_exported_recipe(package):
+    return os.path.exists(os.path.join(package.recipe_folder, "conanmanifest.txt"))
 
-            if commit_package_version != package_version:
-                break
+def get_package_version(package):
+    if is_exported_recipe(package):
+        return None
 
-            # If there are no changes for this recipe on the main branch
-            if recipe_tree.id != previous_recipe_tree_id:
-                revision_count += 1
-                previous_recipe_tree_id = recipe_tree.id
+    repository = os.path.dirname(package.recipe_folder)
+    conan_path = os.path.join(repository, package.name, "conandata.yml")
 
-    recipe_version = package_version
+    # Use version from metadata if conandata.yml cannot be accessed
+    if not os.path.exists(conan_path):
+        return None
 
-    # If we're not building off main, or there any local changes, then consider this a prerelease version
-    if is_prerelease or is_dirty:
-        recipe_version = f"{recipe_version}-g{commit.short_id}"
+    history = get_repository_history(repository)
 
-    # Add the revision count as a build version, this will force Conan to pick up newer builds
-    recipe_version = f"{recipe_version}+{revision_count}"
+    if history is None or package.name not in history["packages"]:
+        return None
 
-    return recipe_version
+    return compute_package_version(history, package.name)
@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+# Builds packages using profile-guided optimization (PGO).
+#
+# 1. The packages are built with instrumentation (-o pgo=generate).  conan create runs the test_package of each
+#    package against the instrumented build, which is the first part of the training run.
+# 2. An optional workload (--workload) is run, to train the packages on a representative workload.
+# 3. The raw profiles are merged into a single .profdata file, using llvm-profdata.
+# 4. The merged profile is packaged as gnustep-pgo-profile/{version} (--version, by default a time stamp), so it can
+#    be uploaded and reused like any other package.
+# 5. The packages are built again (-o pgo=use), optimized using that profile.  The reference of the profile package
+#    is part of their package ids.
+#
+# If an existing profile is passed using --profile-data (e.g. from the res/pgo folder of the gnustep-pgo-profile
+# package), the training steps are skipped.  If an existing profile package is passed using --profile-version, the
+# packaging step is skipped as well.
+#
+# Example:
+#   python gnustep-helpers/pgo.py libobjc2 gnustep-base -- --profile:a=profiles/linux-clang -c tools.build:skip_test=True
+
+# The packages which support profile-guided optimization, in build order
+PGO_PACKAGES = ["libobjc2", "gnustep-base"]
+
+def conan_create(conan, package, pgo, conan_args, env=None):
+    # Apply the pgo option to all packages which support it, so gnustep-base is trained against an
+    # instrumented copy of libobjc2 (and vice versa)
+    options = []
+    for name in PGO_PACKAGES:
+        options.extend(["-o", f"{name}/*:pgo={pgo}"])
+
+    subprocess.run([*conan, "create", package, *options, *conan_args], check=True, env=env)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Build GNUstep packages using profile-guided optimization")
+    parser.add_argument("packages", nargs="*", default=PGO_PACKAGES, help="the recipe folders to build")
+    parser.add_argument("--output", default="pgo", help="the folder in which profiles are stored")
+    parser.add_argument("--profile-data", help="an existing .profdata file; skips training")
+    parser.add_argument("--profile-version", help="the version of an existing gnustep-pgo-profile package; skips training and packaging")
+    parser.add_argument("--version", default=time.strftime("%Y%m%d.%H%M%S"), help="the version of the gnustep-pgo-profile package (default: a time stamp)")
+    parser.add_argument("--workload", help="a shell command which is run as part of the training")
+    parser.add_argument("--llvm-profdata", default="llvm-profdata", help="the llvm-profdata executable")
+    parser.add_argument("--conan", default="conan", help="the conan executable")
+
+    # Arguments after -- are passed to conan create
+    conan_args = []
+    if "--" in argv:
+        conan_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    args = parser.parse_args(argv)
+    conan = shlex.split(args.conan)
+    profile_data = args.profile_data
+    profile_version = args.profile_version
+
+    if not profile_data and not profile_version:
+        raw_folder = os.path.abspath(os.path.join(args.output, "raw"))
+        os.makedirs(raw_folder, exist_ok=True)
+
+        # %p (process id) and %m (module signature) keep concurrent processes and libraries from overwriting
+        # each other's profiles
+        env = dict(os.environ)
+        env["LLVM_PROFILE_FILE"] = os.path.join(raw_folder, "%m-%p.profraw")
+
+        for package in args.packages:
+            conan_create(conan, package, "generate", conan_args, env=env)
+
+        if args.workload:
+            subprocess.run(args.workload, shell=True, check=True, env=env)
+
+        raw_profiles = sorted(glob.glob(os.path.join(raw_folder, "*.profraw")))
+        if not raw_profiles:
+            sys.exit(f"The training run didn't produce any profiles in {raw_folder}")
+
+        profile_data = os.path.abspath(os.path.join(args.output, "gnustep.profdata"))
+        subprocess.run([args.llvm_profdata, "merge", f"-output={profile_data}", *raw_profiles], check=True)
+
+    if not profile_version:
+        # The profile is exported with the recipe, so the recipe revision of the package changes with the profile
+        recipe_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gnustep-pgo-profile")
+        shutil.copyfile(profile_data, os.path.join(recipe_folder, "gnustep.profdata"))
+        subprocess.run([*conan, "create", recipe_folder, "--version", args.version, *conan_args], check=True)
+        profile_version = args.version
+
+    for package in args.packages:
+        conan_create(conan, package, "use", [*conan_args, "-c", f"user.gnustep:pgo_profile_version={profile_version}"])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,111 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# A local, sha256-addressed store of the upstream sources of all recipes.
+#
+# The sources listed in the conandata.yml file of each recipe are downloaded (in parallel) into the store, as
+# {store}/{sha256}/{file name}.  When the store is configured (-c user.gnustep:source_store=<path>), source()
+# extracts the sources from the store, and only downloads them from the upstream URL if they're not in the store.
+# This makes the source steps local file operations, e.g. on build machines without (reliable) internet access.
+#
+# Example:
+#   python gnustep-helpers/sources.py --store ~/gnustep-sources
+#   conan create gnustep-base -c user.gnustep:source_store=~/gnustep-sources
+
+def get_store_path(store, sha256, url):
+    # Keep the file name of the URL, so the archive format can be determined from its extension
+    filename = os.path.basename(urllib.parse.urlparse(url).path)
+    return os.path.join(os.path.expanduser(store), sha256, filename)
+
+def get_sha256(path):
+    sha256 = hashlib.sha256()
+
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+# Returns the sources of all recipes in the repository, as (recipe, source) tuples
+def read_sources(repository):
+    import yaml
+
+    sources = []
+
+    for name in sorted(os.listdir(repository)):
+        conan_path = os.path.join(repository, name, "conandata.yml")
+        if not os.path.isfile(conan_path):
+            continue
+
+        with open(conan_path) as stream:
+            data = yaml.safe_load(stream)
+
+        for source in data.get("sources", {}).values():
+            sources.append((name, source))
+
+    return sources
+
+def prefetch(store, source, timeout=60):
+    # Downloads a source into the store, unless it's already there.  The file is downloaded to a temporary file,
+    # which is only moved into the store after its sha256 was verified.  Returns True if the file was downloaded.
+    # timeout (in seconds) applies to connecting and to each read, so a stalled download fails instead of hanging.
+    path = get_store_path(store, source["sha256"], source["url"])
+    if os.path.exists(path):
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+
+    try:
+        with os.fdopen(fd, "wb") as stream, urllib.request.urlopen(source["url"], timeout=timeout) as response:
+            while chunk := response.read(1024 * 1024):
+                stream.write(chunk)
+
+        sha256 = get_sha256(temp_path)
+        if sha256 != source["sha256"]:
+            raise ValueError(f"{source['url']} has sha256 {sha256}, but {source['sha256']} was expected")
+
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return True
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Download the sources of all GNUstep recipes into a local store")
+    parser.add_argument("recipes", nargs="*", help="the recipes for which to download sources (default: all)")
+    parser.add_argument("--store", required=True, help="the folder in which the sources are stored")
+    parser.add_argument("--repository", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), help="the folder which contains the recipes")
+    parser.add_argument("--jobs", type=int, default=8, help="the number of parallel downloads")
+    parser.add_argument("--timeout", type=float, default=60, help="the timeout of each download, in seconds, when the server doesn't respond (default: 60)")
+    args = parser.parse_args(argv)
+
+    sources = [(name, source) for name, source in read_sources(args.repository) if not args.recipes or name in args.recipes]
+
+    def run(item):
+        name, source = item
+        try:
+            downloaded = prefetch(args.store, source, args.timeout)
+            print(f"{name}: {'downloaded' if downloaded else 'already in the store'} {source['url']}")
+            return True
+        except Exception as e:
+            print(f"{name}: failed to download {source['url']}: {e}", file=sys.stderr)
+            return False
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(run, sources))
+
+    if not all(results):
+        sys.exit(1)
+
+    print(f"Use -c user.gnustep:source_store={os.path.abspath(os.path.expanduser(args.store))} to build from the store")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,378 @@
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+# Builds the whole GNUstep stack, running independent conan create invocations concurrently.
+#
+# All recipes are exported first (gnustep-helpers, which the others use as python_requires, goes first).  The
+# dependency graph is then resolved by conan, for each configuration (--config) separately, using
+# conan graph build-order with the profile and options of that configuration: conditional requirements (e.g.
+# libobjc2, which is only used with the ng runtime) only show up in the configurations which use them, and recipes
+# which are invalid in a configuration (e.g. the static runtime on macOS) are skipped in that configuration.
+#
+# Requirements which aren't recipes in this repository (e.g. icu) and which have to be built are built first, one
+# at a time, before any of the recipes in this repository are built; the concurrent conan create invocations share
+# a single Conan cache, so they must never build (or export) the same package at the same time.
+#
+# Each configuration builds the stack once; configurations (e.g. the gnu and ng runtimes) don't depend on each
+# other and are scheduled concurrently.  The job budget (--jobs) is split between the number of concurrent conan
+# create invocations (--parallel) and the number of jobs of each build (tools.build:jobs).  When several recipes
+# are ready to build, the one with the longest path to the end of the build goes first; the durations of the
+# previous run (in --output/stack.json) are used to estimate that path.
+#
+# The output of each conan invocation is written to --output/logs/.  At the end, the duration of each build and
+# the critical path through the graph are printed.
+#
+# Example:
+#   python gnustep-helpers/stack.py --jobs 32 \
+#       --config "ng=--profile:a=profiles/linux-clang" \
+#       --config "gnu=--profile:a=profiles/linux-gcc" \
+#       --args "gnustep-base=-c tools.build:skip_test=True"
+
+HELPERS = "gnustep-helpers"
+
+# gnustep-pgo-profile is created by pgo.py, from a training run, so it isn't part of the stack
+PGO_PROFILE = "gnustep-pgo-profile"
+
+def get_recipes(repository):
+    return sorted(name for name in os.listdir(repository) if os.path.isfile(os.path.join(repository, name, "conanfile.py")) and name != PGO_PROFILE)
+
+def run_conan(command, log_path, verbose=False):
+    # Runs a conan command, appending its output to a log file.  Returns the return code, and the output on stdout
+    # (which is where conan writes formatted output, e.g. --format=json).
+    with open(log_path, "a") as log:
+        log.write(shlex.join(command) + "\n")
+        log.flush()
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=None if verbose else log, text=True)
+        log.write(process.stdout)
+
+    return process.returncode, process.stdout
+
+def export_recipes(repository, recipes, conan, logs_folder, verbose):
+    # Exports all recipes, so conan can resolve the requirements between them.  This also means the concurrent
+    # conan create invocations don't export new recipe revisions while other builds are resolving their graph.
+    log_path = os.path.join(logs_folder, "export.log")
+    open(log_path, "w").close()
+
+    for recipe in sorted(recipes, key=lambda r: r != HELPERS):
+        returncode, _ = run_conan([*conan, "export", os.path.join(repository, recipe)], log_path, verbose)
+        if returncode != 0:
+            sys.exit(f"Failed to export {recipe}, see {log_path}")
+
+def read_build_order(repository, recipe, args, conan, log_path, verbose):
+    # Returns the packages in the dependency graph of a recipe, as (name, package) tuples in build order, where
+    # package is an entry of the packages of conan graph build-order (with the binary status and the build_args),
+    # or None if the recipe can't be resolved in this configuration (e.g. it's invalid).
+    command = [*conan, "graph", "build-order", os.path.join(repository, recipe), "--order-by=recipe", "--build=missing", "--format=json", *args]
+    returncode, output = run_conan(command, log_path, verbose)
+    if returncode != 0:
+        return None
+
+    data = json.loads(output)
+    packages = []
+
+    for level in data["order"] if isinstance(data, dict) else data:
+        for item in level:
+            name = item["ref"].split("/")[0]
+            for package_level in item.get("packages", [[]]):
+                for package in package_level:
+                    packages.append((name, package))
+
+    return packages
+
+# Resolves the dependency graph of the selected recipes (and the recipes they depend on) in a configuration.
+# Returns the graph, as a dictionary of recipe: [recipes it depends on], and the packages which aren't recipes in
+# this repository and have to be built, as a list of build_args in build order.
+def read_graph(repository, recipes, configuration, args, conan, logs_folder, verbose):
+    log_path = os.path.join(logs_folder, f"{configuration}-graph.log")
+    open(log_path, "w").close()
+
+    all_recipes = get_recipes(repository)
+    graph = {}
+    dependencies = []
+    pending = sorted(recipes)
+
+    while pending:
+        recipe = pending.pop(0)
+        if recipe in graph:
+            continue
+
+        packages = read_build_order(repository, recipe, args(recipe), conan, log_path, verbose)
+        if packages is None:
+            print(f"  skipping {configuration}/{recipe}, which can't be resolved in this configuration (see {log_path})")
+            graph[recipe] = None
+            continue
+
+        # The build order lists the recipes the recipe depends on, directly or indirectly
+        graph[recipe] = sorted(set(name for name, _ in packages if name in all_recipes and name != recipe))
+        pending.extend(graph[recipe])
+
+        for name, package in packages:
+            if name not in all_recipes and package.get("binary") == "Build" and package.get("build_args") not in dependencies:
+                dependencies.append(package["build_args"])
+
+    # Drop the recipes which can't be built in this configuration, and the recipes which depend on them
+    skipped = set(recipe for recipe, requirements in graph.items() if requirements is None)
+    while True:
+        dependents = set(recipe for recipe, requirements in graph.items() if recipe not in skipped and skipped.intersection(requirements))
+        if not dependents:
+            break
+        for recipe in sorted(dependents):
+            print(f"  skipping {configuration}/{recipe}, which depends on a recipe which is skipped")
+        skipped.update(dependents)
+
+    return {recipe: requirements for recipe, requirements in graph.items() if recipe not in skipped}, dependencies
+
+def build_dependencies(configuration, dependencies, args, conan, jobs, logs_folder, verbose):
+    # Builds the packages which aren't recipes in this repository, one at a time, so no two conan invocations
+    # build the same package into the cache concurrently
+    log_path = os.path.join(logs_folder, f"{configuration}-dependencies.log")
+    open(log_path, "w").close()
+
+    for build_args in dependencies:
+        print(f"  building {build_args} ({configuration})")
+        command = [*conan, "install", *shlex.split(build_args), *args, "-c", f"tools.build:jobs={jobs}"]
+        returncode, _ = run_conan(command, log_path, verbose)
+        if returncode != 0:
+            sys.exit(f"Failed to build {build_args} ({configuration}), see {log_path}")
+
+class Build:
+    def __init__(self, configuration, recipe, args):
+        self.configuration = configuration
+        self.recipe = recipe
+        self.args = args
+        self.dependencies = []
+        self.dependents = []
+        self.estimate = 1.0
+        self.priority = 0.0
+        self.start = None
+        self.end = None
+        self.returncode = None
+
+    @property
+    def name(self):
+        return f"{self.configuration}/{self.recipe}" if self.configuration else self.recipe
+
+    @property
+    def duration(self):
+        return self.end - self.start if self.end is not None else 0
+
+def create_builds(graphs, configurations, recipe_args, conan_args):
+    builds = {}
+
+    for configuration, graph in graphs.items():
+        for recipe in graph:
+            args = [*shlex.split(configurations[configuration]), *conan_args, *shlex.split(recipe_args.get(recipe, ""))]
+            builds[f"{configuration}/{recipe}"] = Build(configuration, recipe, args)
+
+    for build in builds.values():
+        for dependency in graphs[build.configuration][build.recipe]:
+            build.dependencies.append(builds[f"{build.configuration}/{dependency}"])
+            build.dependencies[-1].dependents.append(build)
+
+    return list(builds.values())
+
+# Sets the priority of each build to the (estimated) duration of the longest path from the build to the end of the
+# graph, and returns the builds in topological order
+def prioritize(builds):
+    order = []
+    visited = set()
+
+    def visit(build, path):
+        if build.name in path:
+            sys.exit(f"The recipes have a dependency cycle: {' -> '.join([*path, build.name])}")
+        if build.name in visited:
+            return
+        for dependency in build.dependencies:
+            visit(dependency, [*path, build.name])
+        visited.add(build.name)
+        order.append(build)
+
+    for build in builds:
+        visit(build, [])
+
+    for build in reversed(order):
+        build.priority = build.estimate + max((dependent.priority for dependent in build.dependents), default=0)
+
+    return order
+
+# Returns the critical path: the chain of builds which determined the end-to-end build time
+def get_critical_path(builds):
+    path = []
+    build = max(builds, key=lambda b: b.end or 0)
+
+    while build:
+        path.insert(0, build)
+        build = max(build.dependencies, key=lambda b: b.end or 0, default=None)
+
+    return path
+
+def run_build(build, repository, conan, jobs, logs_folder, verbose):
+    log_path = os.path.join(logs_folder, f"{build.name.replace('/', '-')}.log")
+    command = [*conan, "create", os.path.join(repository, build.recipe), *build.args, "-c", f"tools.build:jobs={jobs}"]
+
+    with open(log_path, "w") as log:
+        log.write(shlex.join(command) + "\n")
+        log.flush()
+        process = subprocess.run(command, stdout=None if verbose else log, stderr=subprocess.STDOUT if not verbose else None)
+
+    return process.returncode, log_path
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Build the GNUstep stack, running independent builds concurrently")
+    parser.add_argument("recipes", nargs="*", help="the recipes to build, including their dependencies (default: all)")
+    parser.add_argument("--config", action="append", help="a configuration, as name=<conan create arguments>")
+    parser.add_argument("--args", action="append", default=[], help="additional arguments for one recipe, as recipe=<conan create arguments>")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="the total number of jobs (default: the number of CPUs)")
+    parser.add_argument("--parallel", type=int, help="the number of concurrent builds (default: the width of the graph, with at least 4 jobs per build)")
+    parser.add_argument("--output", default="stack", help="the folder in which logs and timings are stored")
+    parser.add_argument("--repository", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), help="the folder which contains the recipes")
+    parser.add_argument("--conan", default="conan", help="the conan executable")
+    parser.add_argument("--dry-run", action="store_true", help="print the build graph, but don't build anything")
+    parser.add_argument("--verbose", action="store_true", help="print the output of conan instead of writing it to log files")
+
+    # Arguments after -- are passed to conan create, for all recipes and configurations (but not to the conan
+    # commands which resolve the graph and build the dependencies, unlike --config and --args)
+    conan_args = []
+    if "--" in argv:
+        conan_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    args = parser.parse_args(argv)
+    conan = shlex.split(args.conan)
+    logs_folder = os.path.join(args.output, "logs")
+    os.makedirs(logs_folder, exist_ok=True)
+
+    configurations = {"default": ""}
+    if args.config:
+        configurations = dict(config.split("=", 1) for config in args.config)
+
+    recipe_args = dict(recipe_arg.split("=", 1) for recipe_arg in args.args)
+
+    all_recipes = get_recipes(args.repository)
+    for recipe in args.recipes:
+        if recipe not in all_recipes:
+            sys.exit(f"There is no recipe named {recipe} in {args.repository}")
+
+    print(f"Exporting {len(all_recipes)} recipes")
+    export_recipes(args.repository, all_recipes, conan, logs_folder, args.verbose)
+
+    # gnustep-helpers is a python_requires package, so exporting it is all there is to building it
+    recipes = [recipe for recipe in args.recipes or all_recipes if recipe != HELPERS]
+
+    graphs = {}
+    dependencies = {}
+    for configuration, config_args in configurations.items():
+        print(f"Resolving the dependency graph of {configuration}")
+        graph_args = lambda recipe: [*shlex.split(config_args), *shlex.split(recipe_args.get(recipe, ""))]
+        graphs[configuration], dependencies[configuration] = read_graph(args.repository, recipes, configuration, graph_args, conan, logs_folder, args.verbose)
+
+    builds = create_builds(graphs, configurations, recipe_args, conan_args)
+    if not builds:
+        sys.exit("There is nothing to build")
+
+    # Use the durations of the previous run to estimate the critical path
+    timings_path = os.path.join(args.output, "stack.json")
+    if os.path.exists(timings_path):
+        with open(timings_path) as stream:
+            previous = json.load(stream)
+        for build in builds:
+            build.estimate = previous.get(build.name, {}).get("duration", build.estimate)
+
+    order = prioritize(builds)
+
+    # The width of the graph is the largest number of builds which don't depend on each other, approximated by the
+    # largest number of builds at the same depth
+    depths = {}
+    for build in order:
+        depths[build.name] = 1 + max((depths[dependency.name] for dependency in build.dependencies), default=0)
+    width = max(list(depths.values()).count(depth) for depth in set(depths.values()))
+
+    parallel = args.parallel or max(1, min(width, args.jobs // 4))
+    jobs = max(1, args.jobs // parallel)
+
+    if any(dependencies.values()):
+        print("Building these dependencies first, one at a time:")
+        for configuration, build_args in dependencies.items():
+            for arg in build_args:
+                print(f"  {configuration:32} {arg}")
+
+    print(f"Building {len(builds)} packages, {parallel} at a time, with {jobs} jobs each")
+    for build in order:
+        after = ", ".join(dependency.name for dependency in build.dependencies) or "-"
+        print(f"  {build.name:32} after {after}")
+
+    if args.dry_run:
+        return
+
+    # Build the dependencies which aren't recipes in this repository before any of the concurrent builds start, so
+    # those don't build the same packages into the cache at the same time
+    for configuration, build_args in dependencies.items():
+        if build_args:
+            build_dependencies(configuration, build_args, shlex.split(configurations[configuration]), conan, args.jobs, logs_folder, args.verbose)
+
+    lock = threading.Condition()
+    pending = sorted(order, key=lambda b: -b.priority)
+    running = []
+    failed = []
+    start = time.monotonic()
+
+    def worker(build):
+        build.start = time.monotonic() - start
+        returncode, log_path = run_build(build, args.repository, conan, jobs, logs_folder, args.verbose)
+        with lock:
+            build.end = time.monotonic() - start
+            build.returncode = returncode
+            running.remove(build)
+            if returncode != 0:
+                failed.append(build)
+            print(f"[{build.end:8.1f}s] {'finished' if returncode == 0 else 'FAILED'} {build.name} ({build.duration:.1f}s, see {log_path})")
+            lock.notify_all()
+
+    def is_ready(build):
+        # A recipe isn't built in two configurations at once, so two conan create invocations never export the
+        # same recipe (conan create exports it again) into the cache concurrently
+        return all(dependency.returncode == 0 for dependency in build.dependencies) \
+            and not any(other.recipe == build.recipe for other in running)
+
+    with lock:
+        while pending and not failed:
+            ready = [build for build in pending if is_ready(build)]
+
+            if ready and len(running) < parallel:
+                build = ready[0]
+                pending.remove(build)
+                running.append(build)
+                print(f"[{time.monotonic() - start:8.1f}s] building {build.name}")
+                threading.Thread(target=worker, args=(build,)).start()
+            else:
+                lock.wait()
+
+        # Let the builds which are running finish, even if another build failed
+        while running:
+            lock.wait()
+
+    finished = [build for build in builds if build.end is not None]
+    with open(timings_path, "w") as stream:
+        json.dump({build.name: {"start": build.start, "duration": build.duration, "returncode": build.returncode} for build in finished}, stream, indent=2)
+
+    if finished:
+        total = max(build.end for build in finished)
+        sequential = sum(build.duration for build in finished)
+        print(f"Built {len(finished)} packages in {total:.1f}s ({sequential:.1f}s when built one after the other)")
+
+        print("Critical path:")
+        for build in get_critical_path(finished):
+            print(f"  {build.name:32} {build.start:8.1f}s - {build.end:8.1f}s ({build.duration:.1f}s)")
+
+    if failed:
+        skipped = ", ".join(build.name for build in pending)
+        sys.exit(f"{', '.join(build.name for build in failed)} failed" + (f"; skipped {skipped}" if skipped else ""))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
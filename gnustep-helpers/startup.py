@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+
+# Compares the startup time of a minimal Foundation program across package configurations, e.g. shared vs static
+# libraries and the ng vs gnu runtime.
+#
+# Each configuration is built using conan create gnustep-base, with the benchmarks enabled.  The test package of
+# gnustep-base runs the startup benchmark (startup.m), and the results are collected in --output/{configuration}.
+# Finally, the cold and warm startup times, the number of shared objects which are loaded and the number of
+# relocations are summarized in a table.
+#
+# Example:
+#   python gnustep-helpers/startup.py -- -c tools.build:skip_test=True
+#   python gnustep-helpers/startup.py --config "ng-lto=--profile:a=profiles/linux-clang -o */*:lto=thin"
+
+# The configurations which are compared by default
+DEFAULT_CONFIGURATIONS = {
+    "ng-shared": "--profile:a=profiles/linux-clang",
+    "ng-static": "--profile:a=profiles/linux-clang -o gnustep-base/*:static_runtime=True",
+    "gnu-shared": "--profile:a=profiles/linux-gcc",
+    "gnu-static": "--profile:a=profiles/linux-gcc -o gnustep-base/*:shared=False",
+}
+
+# The columns of the summary: (title, function which extracts the value from the results)
+COLUMNS = [
+    ("cold main", lambda r: r.get("cold", {}).get("main_ns", 0) / 1e6),
+    ("cold NSLog", lambda r: r.get("cold", {}).get("first_nslog_ns", 0) / 1e6),
+    ("warm +load", lambda r: r["warm"]["load_ns"] / 1e6),
+    ("warm main", lambda r: r["warm"]["main_ns"] / 1e6),
+    ("warm init", lambda r: r["warm"]["initialize_ns"] / 1e6),
+    ("warm NSLog", lambda r: r["warm"]["first_nslog_ns"] / 1e6),
+    ("objects", lambda r: r["loaded_objects"]),
+    ("relocations", lambda r: r.get("ld_debug_statistics", {}).get("number_of_relocations", 0)),
+]
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compare the startup time of GNUstep package configurations")
+    parser.add_argument("--config", action="append", help="a configuration, as name=<conan create arguments>")
+    parser.add_argument("--output", default="startup", help="the folder in which results are stored")
+    parser.add_argument("--conan", default="conan", help="the conan executable")
+
+    # Arguments after -- are passed to conan create, for all configurations
+    conan_args = []
+    if "--" in argv:
+        conan_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    args = parser.parse_args(argv)
+    conan = shlex.split(args.conan)
+
+    configurations = DEFAULT_CONFIGURATIONS
+    if args.config:
+        configurations = dict(config.split("=", 1) for config in args.config)
+
+    results = {}
+    for name, config_args in configurations.items():
+        results_folder = os.path.abspath(os.path.join(args.output, name))
+
+        subprocess.run([
+            *conan, "create", "gnustep-base",
+            *shlex.split(config_args),
+            "-c", "user.gnustep:benchmark=True",
+            "-c", f"user.gnustep:benchmark_folder={results_folder}",
+            *conan_args], check=True)
+
+        with open(os.path.join(results_folder, "startup.json")) as stream:
+            results[name] = json.load(stream)
+
+    print(f"{'configuration':16}" + "".join(f"{title:>13}" for title, _ in COLUMNS))
+    for name, result in results.items():
+        print(f"{name:16}" + "".join(f"{value(result):13.2f}" for _, value in COLUMNS))
+
+    print("Times are in milliseconds (median); 'init' is the time to initialize the first Foundation classes.")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
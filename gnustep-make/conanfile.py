@@ -1,6 +1,5 @@
 from conan import ConanFile
 from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain
-from conan.tools.files import get
 from conan.tools.build import cross_building
 from conan.tools.env import VirtualRunEnv
 from conan.errors import ConanInvalidConfiguration
@@ -26,7 +25,8 @@ class GnustepMakeRecipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
 
     def validate(self):
         # Require clang 20 on Windows
@@ -78,12 +78,22 @@ class GnustepMakeRecipe(ConanFile):
 
     def build(self):
         autotools = Autotools(self)
-        autotools.configure()
-        autotools.make()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            autotools.configure()
+        self.python_requires["gnustep-helpers"].module.gnustep_make(self, autotools)
 
     def package(self):
         autotools = Autotools(self)
-        autotools.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            autotools.install()
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
 
     def package_info(self):
         self.cpp_info.includedirs = []
@@ -0,0 +1,35 @@
+from conan import ConanFile
+from conan.errors import ConanException
+from conan.tools.files import copy
+
+import os
+
+class GnustepPgoProfileRecipe(ConanFile):
+    # The profile data (.profdata) which libobjc2 and gnustep-base are optimized with when they're built with
+    # -o pgo=use.  gnustep-helpers/pgo.py creates this package at the end of a training run; the version is passed
+    # on the command line (conan create gnustep-pgo-profile --version ...).
+    #
+    # The profile is part of the recipe (gnustep.profdata, next to this file, is exported with it), so the recipe
+    # revision changes with the profile, and libobjc2 and gnustep-base include the full reference of this package
+    # in their package ids.
+    name = "gnustep-pgo-profile"
+    license = "MIT"
+    url = "https://github.com/qmfrederik/conan-gnustep"
+    description = "Profile data for the profile-guided optimization of libobjc2 and gnustep-base"
+
+    exports_sources = "*.profdata"
+
+    def package(self):
+        if not os.path.isfile(os.path.join(self.source_folder, "gnustep.profdata")):
+            raise ConanException("gnustep-pgo-profile needs a gnustep.profdata file next to its conanfile.py; run gnustep-helpers/pgo.py to create one")
+
+        copy(self, "gnustep.profdata", src=self.source_folder, dst=os.path.join(self.package_folder, "res", "pgo"))
+
+    def package_info(self):
+        self.cpp_info.includedirs = []
+        self.cpp_info.libdirs = []
+        self.cpp_info.bindirs = []
+        self.cpp_info.resdirs = ["res"]
+
+        # The path of the profile, for the recipes which are optimized with it (see get_pgo_profile in gnustep-helpers)
+        self.conf_info.define("user.gnustep:pgo_profile", os.path.join(self.package_folder, "res", "pgo", "gnustep.profdata"))
@@ -1,7 +1,7 @@
 import os
 from conan import ConanFile
 from conan.tools.cmake import CMakeToolchain, CMake, cmake_layout, CMakeDeps
-from conan.tools.files import get, apply_conandata_patches
+from conan.tools.files import apply_conandata_patches
 
 class LibDispatchRecipe(ConanFile):
     name = "libdispatch"
@@ -13,8 +13,8 @@ class LibDispatchRecipe(ConanFile):
     
     # Binary configuration
     settings = "os", "compiler", "build_type", "arch"
-    options = {"shared": [True, False], "fPIC": [True, False]}
-    default_options = {"shared": True, "fPIC": True}
+    options = {"shared": [True, False], "fPIC": [True, False], "lto": ["off", "thin", "full"], "function_sections": [True, False]}
+    default_options = {"shared": True, "fPIC": True, "lto": "off", "function_sections": False}
     exports_sources = "*.patch"
     python_requires = "gnustep-helpers/0.1"
 
@@ -22,13 +22,17 @@ class LibDispatchRecipe(ConanFile):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
-        apply_conandata_patches(self)
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
+            apply_conandata_patches(self)
 
     def config_options(self):
         if self.settings.os == "Windows":
             self.options.rm_safe("fPIC")
 
+    def validate(self):
+        self.python_requires["gnustep-helpers"].module.validate_lto(self)
+
     def configure(self):
         if self.options.shared:
             self.options.rm_safe("fPIC")
@@ -37,21 +41,56 @@ class LibDispatchRecipe(ConanFile):
         cmake_layout(self)
     
     def generate(self):
+        def yes_no(opt): return "YES" if opt else "NO"
+
         deps = CMakeDeps(self)
         deps.generate()
         tc = CMakeToolchain(self)
 
-        tc.variables["BUILD_TESTING"] = "NO"
+        tc.variables["BUILD_TESTING"] = yes_no(not self.conf.get("tools.build:skip_test", default=False))
+
+        # Enable link-time optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_lto(self, tc)
+
+        # Place each function in its own section, if configured (e.g. by the static_runtime option of gnustep-base)
+        self.python_requires["gnustep-helpers"].module.configure_cmake_function_sections(self, tc)
+
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_compiler_cache(self, tc)
+
         tc.generate()
 
     def build(self):
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            cmake.configure()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "build"):
+            cmake.build()
+
+        # Run the upstream test suite in parallel, unless tools.build:skip_test is set
+        self.python_requires["gnustep-helpers"].module.run_ctest(self)
 
     def package(self):
         cmake = CMake(self)
-        cmake.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            cmake.install()
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
 
     def package_info(self):
         self.cpp_info.libs = ["dispatch"]
+
+        # When linking statically, the blocks runtime (which libdispatch ships) needs to be linked explicitly
+        if not self.options.shared:
+            self.cpp_info.libs.append("BlocksRuntime")
+
+            if self.settings.os in ["Linux", "FreeBSD"]:
+                self.cpp_info.system_libs = ["pthread"]
+
+        self.python_requires["gnustep-helpers"].module.package_info_lto(self)
@@ -0,0 +1,296 @@
+#include <dispatch/dispatch.h>
+
+#include "bench.h"
+
+// Concurrency benchmarks for libdispatch: the scaling of dispatch_async throughput on the global queue and of
+// dispatch_apply from 1 to N cores, dispatch_async throughput on a serial queue, group and semaphore latency, and
+// timer source jitter.  The results are written as JSON (see bench.h), with the maximum latency of each benchmark
+// in max_ns.
+//
+// The function (_f) variants of the libdispatch API are used, so this doesn't depend on blocks support.
+
+static void report(const char *name, long iterations, int threads, double ns_per_op, double max_ns)
+{
+    bench_emit("%s\n    {\"name\": \"%s\", \"iterations\": %ld, \"threads\": %d, \"ns_per_op\": %.3f, \"max_ns\": %.3f}",
+        bench_separator(), name, iterations, threads, ns_per_op, max_ns);
+}
+
+static long counter;
+
+static void increment(void *context)
+{
+    __atomic_fetch_add(&counter, 1, __ATOMIC_RELAXED);
+}
+
+// The core counts the scaling benchmarks run on: powers of two up to, and including, the number of cores
+static long next_core_count(long cores, long max_cores)
+{
+    if (cores >= max_cores)
+    {
+        return 0;
+    }
+    return cores * 2 < max_cores ? cores * 2 : max_cores;
+}
+
+static void bench_async(const char *name, dispatch_queue_t queue, long iterations)
+{
+    dispatch_group_t group = dispatch_group_create();
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        dispatch_group_async_f(group, queue, NULL, increment);
+    }
+    dispatch_group_wait(group, DISPATCH_TIME_FOREVER);
+    double elapsed = bench_now_ns() - start;
+
+    report(name, iterations, 1, elapsed / (double)iterations, 0);
+    dispatch_release(group);
+}
+
+// Work items are submitted to the global queue by several threads at once, each submitting an equal share
+struct async_state
+{
+    dispatch_group_t group;
+    dispatch_queue_t queue;
+    long iterations_per_thread;
+};
+
+static void async_producer(void *context, size_t index)
+{
+    struct async_state *state = context;
+    for (long i = 0; i < state->iterations_per_thread; i++)
+    {
+        dispatch_group_async_f(state->group, state->queue, NULL, increment);
+    }
+}
+
+static void bench_async_scaling(long max_cores, long iterations)
+{
+    struct async_state state;
+    state.queue = dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_DEFAULT, 0);
+
+    for (long cores = 1; cores; cores = next_core_count(cores, max_cores))
+    {
+        state.group = dispatch_group_create();
+        state.iterations_per_thread = iterations / cores;
+
+        double start = bench_now_ns();
+        dispatch_apply_f((size_t)cores, state.queue, &state, async_producer);
+        dispatch_group_wait(state.group, DISPATCH_TIME_FOREVER);
+        double elapsed = bench_now_ns() - start;
+
+        long total = state.iterations_per_thread * cores;
+        char name[64];
+        snprintf(name, sizeof(name), "async_global_queue_%ld_cores", cores);
+        report(name, total, (int)cores, elapsed / (double)total, 0);
+
+        dispatch_release(state.group);
+    }
+}
+
+// A fixed amount of CPU-bound work, split into chunks which are processed using dispatch_apply.  Each chunk writes
+// its result to its own cache line, so the chunks don't share any memory while they're timed.
+struct apply_result
+{
+    double value;
+    char padding[64 - sizeof(double)];
+};
+
+struct apply_state
+{
+    long work_per_chunk;
+    struct apply_result *results;
+};
+
+static volatile double apply_sink;
+
+static void apply_chunk(void *context, size_t index)
+{
+    struct apply_state *state = context;
+    double value = 0;
+    for (long i = 0; i < state->work_per_chunk; i++)
+    {
+        value += (double)(i ^ (long)index) * 0.5;
+    }
+    state->results[index].value = value;
+}
+
+static void bench_apply(long max_cores, long work)
+{
+    dispatch_queue_t queue = dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_DEFAULT, 0);
+    struct apply_state state;
+    state.results = calloc((size_t)max_cores, sizeof(struct apply_result));
+
+    double single_core = 0;
+    for (long cores = 1; cores; cores = next_core_count(cores, max_cores))
+    {
+        state.work_per_chunk = work / cores;
+
+        double start = bench_now_ns();
+        dispatch_apply_f((size_t)cores, queue, &state, apply_chunk);
+        double elapsed = bench_now_ns() - start;
+
+        // Fold the results, so the work can't be optimized away
+        double total = 0;
+        for (long i = 0; i < cores; i++)
+        {
+            total += state.results[i].value;
+        }
+        apply_sink = total;
+
+        if (cores == 1)
+        {
+            single_core = elapsed;
+        }
+
+        char name[64];
+        snprintf(name, sizeof(name), "apply_%ld_cores", cores);
+        report(name, work, (int)cores, elapsed / (double)work, 0);
+
+        fprintf(stderr, "dispatch_apply on %ld cores: %.2fx speedup\n", cores, single_core / elapsed);
+    }
+
+    free(state.results);
+}
+
+static dispatch_semaphore_t ping;
+static dispatch_semaphore_t pong;
+static long ping_pong_iterations;
+
+static void pong_worker(void *context)
+{
+    for (long i = 0; i < ping_pong_iterations; i++)
+    {
+        dispatch_semaphore_wait(ping, DISPATCH_TIME_FOREVER);
+        dispatch_semaphore_signal(pong);
+    }
+}
+
+static void nop(void *context)
+{
+}
+
+static void bench_latency(long iterations)
+{
+    // Semaphore round trip between two threads
+    ping = dispatch_semaphore_create(0);
+    pong = dispatch_semaphore_create(0);
+    ping_pong_iterations = iterations;
+
+    dispatch_queue_t queue = dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_DEFAULT, 0);
+    dispatch_group_t group = dispatch_group_create();
+    dispatch_group_async_f(group, queue, NULL, pong_worker);
+
+    double max = 0;
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        double round_trip = bench_now_ns();
+        dispatch_semaphore_signal(ping);
+        dispatch_semaphore_wait(pong, DISPATCH_TIME_FOREVER);
+        round_trip = bench_now_ns() - round_trip;
+        max = round_trip > max ? round_trip : max;
+    }
+    report("semaphore_round_trip", iterations, 2, (bench_now_ns() - start) / (double)iterations, max);
+
+    // Wait for the worker to return before releasing the semaphores it uses
+    dispatch_group_wait(group, DISPATCH_TIME_FOREVER);
+    dispatch_release(ping);
+    dispatch_release(pong);
+
+    // Time between submitting a work item to a group, and the group wait returning
+    max = 0;
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        double round_trip = bench_now_ns();
+        dispatch_group_async_f(group, queue, NULL, nop);
+        dispatch_group_wait(group, DISPATCH_TIME_FOREVER);
+        round_trip = bench_now_ns() - round_trip;
+        max = round_trip > max ? round_trip : max;
+    }
+    report("group_round_trip", iterations, 2, (bench_now_ns() - start) / (double)iterations, max);
+
+    dispatch_release(group);
+}
+
+#define TIMER_FIRES 200
+#define TIMER_INTERVAL_NS 1000000
+
+struct timer_state
+{
+    dispatch_source_t source;
+    dispatch_semaphore_t done;
+    double fire_times[TIMER_FIRES];
+    int fires;
+};
+
+static void timer_fired(void *context)
+{
+    struct timer_state *state = context;
+    if (state->fires < TIMER_FIRES)
+    {
+        state->fire_times[state->fires++] = bench_now_ns();
+        if (state->fires == TIMER_FIRES)
+        {
+            dispatch_semaphore_signal(state->done);
+        }
+    }
+}
+
+static void bench_timer(void)
+{
+    static struct timer_state state;
+    state.done = dispatch_semaphore_create(0);
+    state.source = dispatch_source_create(DISPATCH_SOURCE_TYPE_TIMER, 0, 0, dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_DEFAULT, 0));
+
+    dispatch_set_context(state.source, &state);
+    dispatch_source_set_event_handler_f(state.source, timer_fired);
+    dispatch_source_set_timer(state.source, dispatch_time(DISPATCH_TIME_NOW, TIMER_INTERVAL_NS), TIMER_INTERVAL_NS, 0);
+    dispatch_resume(state.source);
+
+    dispatch_semaphore_wait(state.done, DISPATCH_TIME_FOREVER);
+    dispatch_source_cancel(state.source);
+
+    // Jitter is the deviation of the time between two consecutive fires from the timer interval
+    double total = 0, max = 0;
+    for (int i = 1; i < TIMER_FIRES; i++)
+    {
+        double jitter = state.fire_times[i] - state.fire_times[i - 1] - TIMER_INTERVAL_NS;
+        jitter = jitter < 0 ? -jitter : jitter;
+        total += jitter;
+        max = jitter > max ? jitter : max;
+    }
+    report("timer_1ms_jitter", TIMER_FIRES - 1, 1, total / (TIMER_FIRES - 1), max);
+
+    dispatch_release(state.source);
+    dispatch_release(state.done);
+}
+
+int main(int argc, char **argv)
+{
+    long iterations = bench_iterations(argc, argv, 1000000);
+    int cores = bench_cpu_count();
+
+    if (!bench_begin(argc, argv))
+    {
+        return EXIT_FAILURE;
+    }
+    bench_emit("\n  \"cores\": %d,", cores);
+
+    bench_begin_results();
+    bench_async_scaling(cores, iterations);
+
+    dispatch_queue_t serial = dispatch_queue_create("benchmark.serial", NULL);
+    bench_async("async_serial_queue", serial, iterations);
+    dispatch_release(serial);
+
+    bench_apply(cores, iterations * 100);
+    bench_latency(iterations / 10);
+    bench_timer();
+    bench_end_results();
+
+    bench_end();
+    return EXIT_SUCCESS;
+}
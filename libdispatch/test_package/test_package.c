@@ -0,0 +1,33 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <dispatch/dispatch.h>
+
+static void increment(void *context)
+{
+    __atomic_fetch_add((int *)context, 1, __ATOMIC_RELAXED);
+}
+
+int main(void)
+{
+    // Run a couple of work items on a global queue, and wait for them to complete
+    int counter = 0;
+    dispatch_group_t group = dispatch_group_create();
+    dispatch_queue_t queue = dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_DEFAULT, 0);
+
+    for (int i = 0; i < 16; i++)
+    {
+        dispatch_group_async_f(group, queue, &counter, increment);
+    }
+
+    dispatch_group_wait(group, DISPATCH_TIME_FOREVER);
+    dispatch_release(group);
+
+    // Not an assert, which is compiled out in Release builds (and the test package is built in Release)
+    if (counter != 16)
+    {
+        fprintf(stderr, "Expected 16 work items to run, but %d did\n", counter);
+        return EXIT_FAILURE;
+    }
+
+    return EXIT_SUCCESS;
+}
@@ -1,6 +1,6 @@
 from conan import ConanFile
 from conan.tools.cmake import CMakeToolchain, CMake, cmake_layout, CMakeDeps
-from conan.tools.files import get
+from conan.tools.build import stdcpp_library
 import os
 
 class libobjc2Recipe(ConanFile):
@@ -14,15 +14,16 @@ class libobjc2Recipe(ConanFile):
 
     # Binary configuration
     settings = "os", "compiler", "build_type", "arch"
-    options = {"shared": [True, False], "fPIC": [True, False]}
-    default_options = {"shared": True, "fPIC": True}
+    options = {"shared": [True, False], "fPIC": [True, False], "lto": ["off", "thin", "full"], "pgo": ["off", "generate", "use"], "function_sections": [True, False], "allocator": ["system", "jemalloc", "mimalloc"], "split_debug_info": [True, False]}
+    default_options = {"shared": True, "fPIC": True, "lto": "off", "pgo": "off", "function_sections": False, "allocator": "system", "split_debug_info": False}
     python_requires = "gnustep-helpers/0.1"
 
     def set_version(self):
         self.version = self.python_requires["gnustep-helpers"].module.get_package_version(self)
 
     def source(self):
-        get(self, **sorted(self.conan_data["sources"].values())[0])
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "source"):
+            self.python_requires["gnustep-helpers"].module.get_sources(self)
 
     def requirements(self):
         self.requires("tsl-robin-map/1.3.0")
@@ -30,14 +31,29 @@ class libobjc2Recipe(ConanFile):
         # Use the blocks runtime which ships with libdispatch
         self.requires("libdispatch/[^6.1.1]")
 
+        # Link an alternative allocator, if configured (e.g. by the allocator option of gnustep-base)
+        self.python_requires["gnustep-helpers"].module.requires_allocator(self)
+
+        # The profile data for profile-guided optimization, if configured
+        self.python_requires["gnustep-helpers"].module.requires_pgo_profile(self)
+
     def config_options(self):
         if self.settings.os == "Windows":
             self.options.rm_safe("fPIC")
 
+    def validate(self):
+        self.python_requires["gnustep-helpers"].module.validate_lto(self)
+        self.python_requires["gnustep-helpers"].module.validate_pgo(self)
+        self.python_requires["gnustep-helpers"].module.validate_allocator(self)
+        self.python_requires["gnustep-helpers"].module.validate_split_debug_info(self)
+
     def configure(self):
         if self.options.shared:
             self.options.rm_safe("fPIC")
 
+        # Make sure the allocator replaces malloc, if configured
+        self.python_requires["gnustep-helpers"].module.configure_allocator(self)
+
     def layout(self):
         cmake_layout(self)
     
@@ -51,17 +67,61 @@ class libobjc2Recipe(ConanFile):
         tc.variables["GNUSTEP_INSTALL_TYPE"] = "NONE"
         tc.variables["TESTS"] = yes_no(not self.conf.get("tools.build:skip_test", default=False))
         tc.variables["EMBEDDED_BLOCKS_RUNTIME"] = "OFF"
+
+        # Enable link-time optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_lto(self, tc)
+
+        # Enable profile-guided optimization, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_pgo(self, tc)
+
+        # Place each function in its own section, if configured (e.g. by the static_runtime option of gnustep-base)
+        self.python_requires["gnustep-helpers"].module.configure_cmake_function_sections(self, tc)
+
+        # Link an alternative allocator, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_allocator(self, tc)
+
+        # Build with debug info which is split off when packaging, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_split_debug_info(self, tc)
+
+        # Route compiles through a compiler cache, if configured
+        self.python_requires["gnustep-helpers"].module.configure_cmake_compiler_cache(self, tc)
+
         tc.generate()
 
     def build(self):
         cmake = CMake(self)
-        cmake.configure()
-        cmake.build()
-        cmake.test()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "configure"):
+            cmake.configure()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "build"):
+            cmake.build()
+
+        # Run the upstream test suite in parallel, unless tools.build:skip_test is set
+        self.python_requires["gnustep-helpers"].module.run_ctest(self)
 
     def package(self):
         cmake = CMake(self)
-        cmake.install()
+        with self.python_requires["gnustep-helpers"].module.build_phase(self, "install"):
+            cmake.install()
+
+        # Move the debug info to the metadata folder, if configured
+        self.python_requires["gnustep-helpers"].module.package_split_debug_info(self)
+
+        self.python_requires["gnustep-helpers"].module.summarize_build_phases(self)
+
+    def package_id(self):
+        self.python_requires["gnustep-helpers"].module.package_id(self, cpp=True)
+
+    def compatibility(self):
+        return self.python_requires["gnustep-helpers"].module.compatibility(self)
 
     def package_info(self):
         self.cpp_info.libs = ["objc"]
+
+        # When linking statically, link the C++ runtime (which is used for exception interoperability).  With the
+        # static runtime of gnustep-base, gnustep-base makes sure the classes in libobjc2 are loaded.
+        if not self.options.shared and self.settings.os in ["Linux", "FreeBSD"]:
+            self.cpp_info.system_libs = ["pthread", stdcpp_library(self) or "stdc++"]
+
+        self.python_requires["gnustep-helpers"].module.package_info_lto(self)
+        self.python_requires["gnustep-helpers"].module.package_info_pgo(self)
+        self.python_requires["gnustep-helpers"].module.package_info_allocator(self)
@@ -0,0 +1,289 @@
+#include <stdint.h>
+#include <string.h>
+#include "objc/runtime.h"
+#include "objc/objc-arc.h"
+
+#ifndef _WIN32
+#include <pthread.h>
+#endif
+
+#include "bench.h"
+
+// Microbenchmarks for the Objective-C runtime: message sends, class and selector lookups, associated objects,
+// weak references and @synchronized.  The results are written as JSON (see bench.h).
+
+#ifdef __has_attribute
+#if __has_attribute(objc_root_class)
+__attribute__((objc_root_class))
+#endif
+#endif
+@interface BenchObject
+{
+    id isa;
+}
++ (id)new;
++ (void)classNop;
+- (void)nop;
+- (id)retain;
+- (void)release;
+- (void)dealloc;
+@end
+
+@implementation BenchObject
++ (id)new
+{
+    return class_createInstance(self, 0);
+}
++ (void)classNop
+{
+}
+- (void)nop
+{
+}
+- (id)retain
+{
+    return objc_retain_fast_np(self);
+}
+- (void)release
+{
+    if (objc_release_fast_no_destroy_np(self))
+    {
+        [self dealloc];
+    }
+}
+- (void)dealloc
+{
+    object_dispose(self);
+}
+// Lets the runtime use its inline reference count for this class
+- (void)_ARCCompliantRetainRelease
+{
+}
+@end
+
+// Subclasses which are used to measure polymorphic call sites
+@interface BenchA : BenchObject @end
+@implementation BenchA - (void)nop {} @end
+@interface BenchB : BenchObject @end
+@implementation BenchB - (void)nop {} @end
+@interface BenchC : BenchObject @end
+@implementation BenchC - (void)nop {} @end
+@interface BenchD : BenchObject @end
+@implementation BenchD - (void)nop {} @end
+
+static volatile intptr_t sink;
+
+static void bench_message_send(long iterations)
+{
+    BenchObject *object = [BenchObject new];
+    id receivers[4] = { [BenchA new], [BenchB new], [BenchC new], [BenchD new] };
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        [object nop];
+    }
+    bench_report("msg_send_instance", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        [BenchObject classNop];
+    }
+    bench_report("msg_send_class", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        [receivers[i & 3] nop];
+    }
+    bench_report("msg_send_polymorphic", iterations, 1, bench_now_ns() - start);
+
+    // The slow path of a message send: resolving the implementation through the dispatch table, and
+    // searching the method lists of the class hierarchy
+    Class cls = objc_getClass("BenchA");
+    SEL selector = sel_registerName("nop");
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (intptr_t)class_getMethodImplementation(cls, selector);
+    }
+    bench_report("method_lookup_dtable", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (intptr_t)class_getInstanceMethod(cls, selector);
+    }
+    bench_report("method_lookup_method_list", iterations, 1, bench_now_ns() - start);
+
+    for (int i = 0; i < 4; i++)
+    {
+        [receivers[i] release];
+    }
+    [object release];
+}
+
+static void bench_lookups(long iterations)
+{
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (intptr_t)objc_getClass("BenchObject");
+    }
+    bench_report("objc_getClass", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (intptr_t)sel_registerName("nop");
+    }
+    bench_report("sel_registerName_existing", iterations, 1, bench_now_ns() - start);
+
+    // Registering new selectors allocates, so use fewer iterations
+    long registrations = iterations / 10;
+    char name[64];
+    start = bench_now_ns();
+    for (long i = 0; i < registrations; i++)
+    {
+        snprintf(name, sizeof(name), "benchmarkSelector%ld:", i);
+        sink += (intptr_t)sel_registerName(name);
+    }
+    bench_report("sel_registerName_new", registrations, 1, bench_now_ns() - start);
+}
+
+static void bench_associated_objects(long iterations)
+{
+    static char key;
+    BenchObject *object = [BenchObject new];
+    BenchObject *value = [BenchObject new];
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        objc_setAssociatedObject(object, &key, value, OBJC_ASSOCIATION_ASSIGN);
+    }
+    bench_report("associated_object_set", iterations, 1, bench_now_ns() - start);
+
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        sink += (intptr_t)objc_getAssociatedObject(object, &key);
+    }
+    bench_report("associated_object_get", iterations, 1, bench_now_ns() - start);
+
+    [object release];
+    [value release];
+}
+
+static void bench_weak_references(long iterations)
+{
+    BenchObject *object = [BenchObject new];
+    id weak = nil;
+
+    double start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        objc_storeWeak(&weak, (i & 1) ? nil : object);
+    }
+    bench_report("weak_store", iterations, 1, bench_now_ns() - start);
+
+    objc_storeWeak(&weak, object);
+    start = bench_now_ns();
+    for (long i = 0; i < iterations; i++)
+    {
+        id strong = objc_loadWeakRetained(&weak);
+        objc_release(strong);
+    }
+    bench_report("weak_load", iterations, 1, bench_now_ns() - start);
+
+    objc_destroyWeak(&weak);
+    [object release];
+}
+
+static BenchObject *lock_object;
+static long synchronized_iterations;
+static long synchronized_counter;
+
+#ifdef _WIN32
+static DWORD WINAPI synchronized_worker(LPVOID arg)
+#else
+static void *synchronized_worker(void *arg)
+#endif
+{
+    for (long i = 0; i < synchronized_iterations; i++)
+    {
+        @synchronized(lock_object)
+        {
+            synchronized_counter++;
+        }
+    }
+    return 0;
+}
+
+static void bench_synchronized(long iterations, int max_threads)
+{
+    lock_object = [BenchObject new];
+    synchronized_iterations = iterations;
+
+    for (int threads = 1; threads <= max_threads; threads *= 2)
+    {
+        char name[64];
+        snprintf(name, sizeof(name), "synchronized_%d_threads", threads);
+
+        double start = bench_now_ns();
+#ifdef _WIN32
+        HANDLE handles[64];
+        for (int i = 0; i < threads; i++)
+        {
+            handles[i] = CreateThread(NULL, 0, synchronized_worker, NULL, 0, NULL);
+        }
+        WaitForMultipleObjects(threads, handles, TRUE, INFINITE);
+        for (int i = 0; i < threads; i++)
+        {
+            CloseHandle(handles[i]);
+        }
+#else
+        pthread_t handles[64];
+        for (int i = 0; i < threads; i++)
+        {
+            pthread_create(&handles[i], NULL, synchronized_worker, NULL);
+        }
+        for (int i = 0; i < threads; i++)
+        {
+            pthread_join(handles[i], NULL);
+        }
+#endif
+        bench_report(name, iterations * threads, threads, bench_now_ns() - start);
+    }
+
+    [lock_object release];
+}
+
+int main(int argc, char **argv)
+{
+    long iterations = bench_iterations(argc, argv, 10000000);
+    int max_threads = bench_cpu_count();
+
+    // WaitForMultipleObjects supports at most 64 handles
+    if (max_threads > 64)
+    {
+        max_threads = 64;
+    }
+
+    if (!bench_begin(argc, argv))
+    {
+        return EXIT_FAILURE;
+    }
+
+    bench_begin_results();
+    bench_message_send(iterations);
+    bench_lookups(iterations);
+    bench_associated_objects(iterations / 10);
+    bench_weak_references(iterations / 10);
+    bench_synchronized(iterations / 10, max_threads);
+    bench_end_results();
+
+    bench_end();
+    return EXIT_SUCCESS;
+}
@@ -1,12 +1,18 @@
 from conan import ConanFile
 from conan.tools.build import can_run
-from conan.tools.cmake import cmake_layout, CMake
+from conan.tools.cmake import cmake_layout, CMake, CMakeToolchain
 import os
 
 
 class TestPackageConan(ConanFile):
     settings = "os", "arch", "compiler", "build_type"
-    generators = "CMakeDeps", "CMakeToolchain"
+    generators = "CMakeDeps"
+    python_requires = "gnustep-helpers/0.1"
+
+    @property
+    def _benchmark(self):
+        # Use -c user.gnustep:benchmark=True to run the runtime microbenchmarks, too
+        return self.python_requires["gnustep-helpers"].module.is_benchmark_enabled(self)
 
     def layout(self):
         cmake_layout(self)
@@ -14,6 +20,11 @@ class TestPackageConan(ConanFile):
     def requirements(self):
         self.requires(self.tested_reference_str)
 
+    def generate(self):
+        tc = CMakeToolchain(self)
+        self.python_requires["gnustep-helpers"].module.configure_cmake_benchmark(self, tc)
+        tc.generate()
+
     def build(self):
         cmake = CMake(self)
         cmake.configure()
@@ -23,3 +34,7 @@ class TestPackageConan(ConanFile):
         if can_run(self):
             bin_path = os.path.join(self.cpp.build.bindir, "test_package")
             self.run(bin_path, env="conanrun")
+
+            if self._benchmark:
+                benchmark_path = os.path.join(self.cpp.build.bindir, "benchmark")
+                self.python_requires["gnustep-helpers"].module.run_benchmark(self, benchmark_path)